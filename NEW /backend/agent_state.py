@@ -12,7 +12,8 @@ class IndicatorAgentState(TypedDict):
     time_frame: Annotated[str, "time period for k line data provided"]
     stock_name: Annotated[dict, "stock name for prompt"]
 
-    # Indicator Agent Tools output values (explicitly added per indicator)
+    # Indicator Agent Tools output values (explicitly added per indicator),
+    # filled once by the Indicator Bundle node at graph start
     rsi: Annotated[List[float], "Relative Strength Index values"]
     macd: Annotated[List[float], "MACD line values"]
     macd_signal: Annotated[List[float], "MACD signal line values"]
@@ -9,16 +9,26 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 load_dotenv()
 
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
+import indicator_engine
+import indicator_graph
+import indicators
+import panel
 from ml_model import predict_price
+import firebase_store
 from firebase_store import store_stock_data
+from bar_cache import BarCache
+from market_data import INTERVAL_PERIOD_MAP, get_provider, period_to_timedelta
+from market_hours import IST, bar_open
+from single_flight import SingleFlight
+from write_behind import WriteBehindQueue
+import shm_store
 
 app = Flask(__name__)
 CORS(app)
 
 try:
+    from default_config import DEFAULT_CONFIG
     from trading_graph import TradingGraph
     QUANTAGENT_AVAILABLE = True
     print("[OK] QuantAgent loaded.")
@@ -26,50 +36,187 @@ except Exception as e:
     print(f"[WARNING] QuantAgent not loaded: {e}")
     QUANTAGENT_AVAILABLE = False
 
-INTERVAL_PERIOD_MAP = {
-    "1m":"7d",
-    "2m":"7d",
-    "5m":"60d",
-    "15m":"60d",
-    "30m":"60d",
-    "1h":"730d",
-    "1d":"2y",
-}
+try:
+    import data_quality
+    import ohlcv_store
+    import resampler
+    import pyarrow  # noqa: F401 – parquet engine used by the store
+    STORE_AVAILABLE = True
+except Exception as e:
+    print(f"[WARNING] Local OHLCV store disabled: {e}")
+    STORE_AVAILABLE = False
+
+provider = get_provider()
+
+# Firestore writes run on a background thread, so requests never wait for them
+persist_queue = WriteBehindQueue(
+    store_stock_data,
+    maxsize=int(os.environ.get("PERSIST_QUEUE_SIZE", "256")),
+    policy=os.environ.get("PERSIST_QUEUE_POLICY", "drop_oldest"),
+    name="firestore",
+)
+
+def _as_utc(ts: pd.Timestamp) -> pd.Timestamp:
+    return ts.tz_convert("UTC") if ts.tzinfo else ts.tz_localize("UTC")
+
+def download_ohlcv(symbol: str, interval: str = "5m", start=None) -> pd.DataFrame:
+    """Canonical OHLCV from the provider: the full period window, or only bars from `start`."""
+    return provider.history(symbol, interval, start=start)
+
+def download_ohlcv_batch(symbols, interval: str = "5m", start=None) -> dict:
+    """Canonical OHLCV for several symbols, in as few provider requests as it supports."""
+    return provider.history_batch(list(symbols), interval, start=start)
+
+def period_window_start(interval: str) -> pd.Timestamp:
+    """
+    Start (UTC) of the history served for `interval`. A derived interval can
+    only reach back as far as its base series' window.
+    """
+    period = period_to_timedelta(INTERVAL_PERIOD_MAP.get(interval, "120d"))
+    if STORE_AVAILABLE and interval in resampler.RESAMPLE_BASE:
+        base = resampler.RESAMPLE_BASE[interval]
+        period = min(period, period_to_timedelta(INTERVAL_PERIOD_MAP.get(base, "120d")))
+    return _as_utc(provider.now()) - period
+
+# (symbol, interval) -> bar_open() of the bar during which it was last topped up
+_topped_up = {}
+
+def load_ohlcv(symbol: str, interval: str = "5m") -> pd.DataFrame:
+    """
+    OHLCV for the interval's period window, served from the local store.
+    Only bars after the stored high-water mark are downloaded; the last stored
+    bar is re-fetched too since it may still have been forming. A series is
+    topped up at most once per bar, and intervals listed in
+    resampler.RESAMPLE_BASE are derived locally from their base series.
+    """
+    if not STORE_AVAILABLE:
+        return download_ohlcv(symbol, interval)
+
+    if interval in resampler.RESAMPLE_BASE:
+        base = load_ohlcv(symbol, resampler.RESAMPLE_BASE[interval])
+        return resampler.load_derived(symbol, interval, base)
+
+    window_start = period_window_start(interval)
+    hwm = ohlcv_store.high_water_mark(symbol, interval)
+    bar = bar_open(interval)
+    if hwm is None or _as_utc(hwm) < window_start:
+        fresh = download_ohlcv(symbol, interval)
+    elif _topped_up.get((symbol, interval)) != bar:
+        fresh = download_ohlcv(symbol, interval, start=hwm)
+    else:
+        fresh = None
+    if fresh is not None:
+        data_quality.ingest(symbol, interval, fresh)
+        _topped_up[(symbol, interval)] = bar
+    return ohlcv_store.read_series(symbol, interval, start=window_start)
+
+def load_ohlcv_batch(symbols, interval: str = "5m") -> dict:
+    """
+    Batched load_ohlcv: symbols with a usable high-water mark share one tail
+    request starting at the oldest of their marks, the rest share one full
+    period request. Derived intervals come from the batched base series, as
+    in load_ohlcv.
+    """
+    if not STORE_AVAILABLE:
+        return download_ohlcv_batch(symbols, interval)
+
+    if interval in resampler.RESAMPLE_BASE:
+        bases = load_ohlcv_batch(symbols, resampler.RESAMPLE_BASE[interval])
+        return {symbol: resampler.load_derived(symbol, interval, bases[symbol]) for symbol in symbols}
+
+    window_start = period_window_start(interval)
+    cold, warm = [], {}
+    for symbol in symbols:
+        hwm = ohlcv_store.high_water_mark(symbol, interval)
+        if hwm is None or _as_utc(hwm) < window_start:
+            cold.append(symbol)
+        else:
+            warm[symbol] = hwm
+
+    fresh = {}
+    if cold:
+        fresh.update(download_ohlcv_batch(cold, interval))
+    if warm:
+        start = min(_as_utc(h) for h in warm.values())
+        fresh.update(download_ohlcv_batch(list(warm), interval, start=start))
+
+    frames = {}
+    bar = bar_open(interval)
+    for symbol in symbols:
+        data_quality.ingest(symbol, interval, fresh.get(symbol))
+        _topped_up[(symbol, interval)] = bar
+        frames[symbol] = ohlcv_store.read_series(symbol, interval, start=window_start)
+    return frames
+
+# Stored history must start within this of the period window start to be
+# served (weekends and holidays leave the first bars later than the window)
+STORED_HISTORY_SLACK = pd.Timedelta(days=5)
+
+def load_stored(symbol: str, interval: str, start) -> pd.DataFrame:
+    """Persisted finalized candles (OHLCV + indicators) from `start` on, indexed by bar time."""
+    try:
+        df = firebase_store.read_series(symbol, interval, start=start)
+    except Exception as e:
+        print(f"[WARNING] Stored history unavailable for {symbol} {interval}: {e}")
+        return pd.DataFrame()
+    if df.empty:
+        return df
+    index = pd.DatetimeIndex(pd.to_datetime(df.pop("time"))).tz_convert(IST)
+    return df.set_index(index.rename("time"))
+
+def load_tail(symbol: str, interval: str, start) -> pd.DataFrame:
+    """Canonical OHLCV bars from `start` on (the local store tops itself up at most once per bar)."""
+    if STORE_AVAILABLE:
+        df = load_ohlcv(symbol, interval)
+        return df[df.index >= start]
+    return download_ohlcv(symbol, interval, start=start)
+
+def top_up_stored(symbol: str, interval: str, stored: pd.DataFrame):
+    """
+    Stored candles plus the provider's bars from the last stored one on (it
+    may have been forming), with indicators computed for those bars only by
+    the checkpointed indicator_engine. None if the engine cannot cover every
+    new bar; the caller then recomputes the whole window.
+    """
+    fresh = load_tail(symbol, interval, stored.index[-1])
+    merged = fresh.combine_first(stored)[stored.columns]
+    out = indicator_engine.update_series(symbol, interval, merged[["close"]],
+                                         closed_before=bar_open(interval))
+    tail = merged.index[merged.index >= stored.index[-1]]
+    if not tail.isin(out.index).all():
+        return None
+    merged.loc[tail, indicators.CHART_COLUMNS] = out.loc[tail, indicators.CHART_COLUMNS]
+    return merged
 
 def fetch_ohlcv(symbol: str, interval: str = "5m") -> pd.DataFrame:
-    period = INTERVAL_PERIOD_MAP.get(interval, "120d")
-    df = yf.download(symbol, period=period, interval=interval, progress=False)
+    """
+    Finalized frame for a series. Persisted history is reused: the provider
+    is only asked for bars from the last stored one on, and indicators are
+    only computed for those. Without usable stored history the full period
+    window is loaded and computed.
+    """
+    window_start = period_window_start(interval)
+    stored = load_stored(symbol, interval, window_start)
+    if (not stored.empty and set(indicators.CHART_COLUMNS).issubset(stored.columns)
+            and _as_utc(stored.index[0]) - window_start <= STORED_HISTORY_SLACK):
+        df = top_up_stored(symbol, interval, stored)
+        if df is not None:
+            return finalize_ohlcv(symbol, df, interval)
+
+    df = load_ohlcv(symbol, interval)
     if df.empty:
         raise ValueError(f"No data for {symbol}")
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
-    df.dropna(inplace=True)
-    df.columns = [c.lower() for c in df.columns]
-
-    # ── Indicators ────────────────────────────────────────────────────────────
-    df["SMA"]   = ta.sma(df["close"], length=20)
-    df["EMA9"]  = ta.ema(df["close"], length=9)
-    df["RSI"]   = ta.rsi(df["close"], length=14)
-
-    # MACD
-    macd        = ta.macd(df["close"])
-    df["MACD"]  = macd["MACD_12_26_9"]  if macd is not None else None
-    df["MACD_S"]= macd["MACDs_12_26_9"] if macd is not None else None
-    df["MACD_H"]= macd["MACDh_12_26_9"] if macd is not None else None
-
-    # Bollinger Bands — detect column names dynamically
-    bb = ta.bbands(df["close"], length=20, std=2)
-    if bb is not None:
-        # Column names vary by pandas_ta version — find them safely
-        bb_cols = bb.columns.tolist()
-        upper = [c for c in bb_cols if c.startswith("BBU")]
-        lower = [c for c in bb_cols if c.startswith("BBL")]
-        mid   = [c for c in bb_cols if c.startswith("BBM")]
-        df["BB_U"] = bb[upper[0]] if upper else None
-        df["BB_L"] = bb[lower[0]] if lower else None
-        df["BB_M"] = bb[mid[0]]   if mid   else None
-    else:
-        df["BB_U"] = df["BB_L"] = df["BB_M"] = None
+    return finalize_ohlcv(symbol, df, interval)
+
+def finalize_ohlcv(symbol: str, df: pd.DataFrame, interval: str = None) -> pd.DataFrame:
+    """Indicators, flat `time` column and Firebase persistence for raw OHLCV."""
+    # ── Indicators (shared library: same values as the agent tools and ML) ──
+    # Only columns the frame lacks are computed, through the field graph so
+    # shared nodes (SMA20 for SMA and BB_M) run once; frames from a panel pass
+    # (panel.py) or a top-up arrive with them all. Every column is needed here
+    # whatever a request's fields=: predict_price, /analyze and the persisted
+    # history read this frame.
+    df = indicator_graph.compute(df, indicators.CHART_COLUMNS)
 
     df.dropna(subset=["SMA","RSI"], inplace=True)
     df.reset_index(inplace=True)
@@ -78,28 +225,86 @@ def fetch_ohlcv(symbol: str, interval: str = "5m") -> pd.DataFrame:
         time_col = df.columns[0]
     df.rename(columns={time_col: "time"}, inplace=True)
     df["time"] = df["time"].astype(str)
-    # Store in Firebase safely (prevent API slowdown)
-    try:
-        store_stock_data(symbol, df.tail(500))   # store only latest candles
-    except Exception as e:
-        print(f"[WARNING] Firebase storage failed: {e}")
+    # Store in Firebase off the request path; repeated submits for a series coalesce
+    # Writes are diff-only, so the whole window is persisted: /chart history is served from it
+    persist_queue.submit((symbol, interval), symbol, df, interval)
+    return df
+
+_inflight = SingleFlight()
+# Market data and everything derived from it only changes at a bar close
+market_cache = BarCache()
+
+def shared_snapshot(symbol: str, interval: str):
+    """
+    The collector's shared-memory copy of a series, if it was published during
+    the current bar; otherwise None and the caller fetches it itself.
+    """
+    df = shm_store.read(symbol, interval)
+    if df is None or df.attrs["updated_at"] < _as_utc(bar_open(interval)):
+        return None
     return df
 
-def df_to_records(df):
-    cols = ["time","open","high","low","close","volume",
-            "SMA","EMA9","RSI","MACD","MACD_S","MACD_H","BB_U","BB_L","BB_M"]
+def load_market_frame(symbol: str, interval: str) -> pd.DataFrame:
+    df = shared_snapshot(symbol, interval)
+    return df if df is not None else fetch_ohlcv(symbol, interval)
+
+def _compute_market_data(symbol: str, interval: str):
+    df = market_cache.get_or_compute(
+        ("ohlcv", symbol, interval), interval, load_market_frame, symbol, interval)
+    pred = market_cache.get_or_compute(
+        ("pred", symbol, interval), interval, predict_price, df)
+    return df, pred
+
+def get_market_data(symbol: str, interval: str = "5m"):
+    """
+    (DataFrame, prediction) for a symbol/interval. Concurrent requests for the
+    same bar share one fetch and one prediction; treat the result as read-only.
+    """
+    key = (symbol, interval, bar_open(interval))
+    return _inflight.do(key, _compute_market_data, symbol, interval)
+
+def df_to_records(df, fields=None):
+    cols = fields or indicator_graph.ALL_FIELDS
     # Only include columns that exist
     cols = [c for c in cols if c in df.columns]
     return df[cols].fillna("null").to_dict(orient="records")
 
+def chart_records(symbol: str, interval: str, df: pd.DataFrame, fields: list, params: dict):
+    """
+    Records for the requested fields only. Indicator nodes with custom
+    parameters are evaluated over the untruncated period window (the frame
+    lost its SMA/RSI warm-up rows in finalize_ohlcv) and memoized per series
+    version, so other charts needing the same node (e.g. MACD for MACD_H)
+    reuse it until the bar closes.
+    """
+    version = indicator_graph.series_version(df)
+    def memo(node, compute):
+        return market_cache.get_or_compute(
+            ("indicator", symbol, interval, version, node), interval, compute)
+    used = indicator_graph.used_params(fields, params)
+    source = None
+    if not all(indicator_graph.is_default(params, family) for family in used):
+        source = market_cache.get_or_compute(("source", symbol, interval), interval,
+                                             load_ohlcv, symbol, interval)
+    return df_to_records(indicator_graph.select(df, fields, params, memo, source), fields)
+
 @app.route("/chart", methods=["GET"])
 def chart():
     symbol   = request.args.get("symbol",   "HDFCBANK.NS")
     interval = request.args.get("interval", "5m")
     try:
-        df      = fetch_ohlcv(symbol, interval)
-        records = df_to_records(df)
-        pred    = predict_price(df)
+        # e.g. fields=close,SMA,RSI&params=rsi:7,sma:50 (macd:12/26/9, bb:20/2)
+        fields = indicator_graph.parse_fields(request.args.get("fields"))
+        params = indicator_graph.parse_params(request.args.get("params"))
+    except ValueError as e:
+        return jsonify({"error": str(e), "data": None}), 400
+    used = indicator_graph.used_params(fields, params)
+    try:
+        df, pred = get_market_data(symbol, interval)
+        params_key = tuple((family, tuple(p.items())) for family, p in used.items())
+        records  = market_cache.get_or_compute(
+            ("records", symbol, interval, indicator_graph.series_version(df), tuple(fields), params_key),
+            interval, chart_records, symbol, interval, df, fields, params)
         trend = "UPTREND" if df["EMA9"].iloc[-1] > df["SMA"].iloc[-1] else "DOWNTREND"
         entry = float(df["close"].iloc[-1])
         stop_loss = entry * 0.99
@@ -108,6 +313,8 @@ def chart():
         
         return jsonify({
             "data": records,
+            "fields": fields,
+            "params": used,
             "latest_price": entry,
             "predicted_price": pred["predicted"],
             "confidence": pred["confidence"],
@@ -133,15 +340,18 @@ def analyze():
         return jsonify({"error": "No API key. Set GOOGLE_API_KEY in .env"}), 400
     os.environ["GOOGLE_API_KEY"] = gemini_key
 
+    df = pred = None
     if QUANTAGENT_AVAILABLE:
         try:
-            df      = fetch_ohlcv(symbol, interval)
-            ml_pred = predict_price(df)
-            predicted_price = ml_pred["predicted"]
+            df, pred = get_market_data(symbol, interval)
+            predicted_price = pred["predicted"]
             kline   = df.tail(30).set_index("time")[
                 ["open","high","low","close","volume"]
             ].to_dict(orient="index")
-            tg          = TradingGraph()
+            config      = dict(DEFAULT_CONFIG)
+            # Precomputed indicators in the prompt skip the tool-call round trip
+            config["inline_indicators"] = bool(body.get("inline_indicators", config["inline_indicators"]))
+            tg          = TradingGraph(config)
             final_state = tg.graph.invoke({
                 "kline_data": kline,
                 "analysis_results": None,
@@ -165,8 +375,9 @@ def analyze():
     try:
         import google.generativeai as genai
         genai.configure(api_key=gemini_key)
-        df   = fetch_ohlcv(symbol, interval)
-        pred = predict_price(df)
+        # Reuse the data/prediction the QuantAgent path already computed
+        if df is None:
+            df, pred = get_market_data(symbol, interval)
         tail = df.tail(5)[["time","open","high","low","close","SMA","RSI"]].to_string(index=False)
         prompt = f"""Expert stock trader analyzing {symbol} (NSE India).
 Last 5 candles:
@@ -191,6 +402,97 @@ Give SHORT trade decision:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def screen_table(interval: str) -> pd.DataFrame:
+    """Latest close and indicators for every listed stock, from one panel pass."""
+    from stocks_list import STOCKS
+    universe = panel.Panel.from_frames(load_ohlcv_batch(STOCKS, interval))
+    return panel.latest(universe, panel.chart_indicators(universe))
+
+@app.route("/screen", methods=["GET"])
+def screen():
+    interval = request.args.get("interval", "5m")
+    sort     = request.args.get("sort", "RSI")
+    ascending = request.args.get("order", "desc") == "asc"
+    try:
+        table = _inflight.do(("screen", interval, bar_open(interval)), market_cache.get_or_compute,
+                             ("screen", interval), interval, screen_table, interval)
+        if sort in table.columns:
+            table = table.sort_values(sort, ascending=ascending)
+        rows = table.reset_index().round(4)
+        rows = rows.astype(object).where(rows.notna(), None)
+        return jsonify({"interval": interval, "sort": sort, "stocks": rows.to_dict(orient="records")})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+def full_history(symbol: str, interval: str) -> pd.DataFrame:
+    """Every stored bar of a series after topping it up; the period window without a store."""
+    df = load_ohlcv(symbol, interval)
+    if STORE_AVAILABLE and interval not in resampler.RESAMPLE_BASE:
+        df = ohlcv_store.read_series(symbol, interval)
+    return df
+
+def parse_lengths(text: str) -> list:
+    """"2-50", "5-200:5" (start-stop:step, inclusive) or "7,14,21"."""
+    try:
+        if "-" in text:
+            bounds, _, step = text.partition(":")
+            start, stop = (int(v) for v in bounds.split("-"))
+            lengths = list(range(start, stop + 1, int(step or 1)))
+        else:
+            lengths = [int(v) for v in text.split(",") if v.strip()]
+    except ValueError:
+        raise ValueError(f"Bad lengths '{text}': use 2-50, 5-200:5 or 7,14,21") from None
+    if not lengths or min(lengths) < 1 or max(lengths) > 5000 or len(lengths) > 500:
+        raise ValueError("lengths must be 1-500 values between 1 and 5000")
+    return lengths
+
+def sweep_table(symbol: str, interval: str, name: str, lengths: tuple) -> pd.DataFrame:
+    """(bar × length) values of one indicator family over the series' full history."""
+    df = full_history(symbol, interval)
+    if df.empty:
+        raise ValueError(f"No data for {symbol}")
+    values = indicators.sweep(name, df["close"], list(lengths))
+    return pd.DataFrame(values, index=df.index.astype(str), columns=list(lengths))
+
+@app.route("/sweep", methods=["GET"])
+def sweep():
+    """
+    One indicator over a range of lengths in a single vectorized pass, e.g.
+    /sweep?symbol=TCS.NS&indicator=rsi&lengths=2-50&tail=500
+    values[i][j] is the indicator at time[i] for lengths[j].
+    """
+    symbol   = request.args.get("symbol",   "HDFCBANK.NS")
+    interval = request.args.get("interval", "5m")
+    name     = request.args.get("indicator", "rsi").lower()
+    try:
+        lengths = parse_lengths(request.args.get("lengths", "2-50"))
+        tail = int(request.args["tail"]) if "tail" in request.args else None
+        if name not in indicators.SWEEPS:
+            raise ValueError(f"No sweep for '{name}' (available: {', '.join(indicators.SWEEPS)})")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        table = market_cache.get_or_compute(
+            ("sweep", symbol, interval, name, tuple(lengths)), interval,
+            sweep_table, symbol, interval, name, tuple(lengths))
+        if tail:
+            table = table.tail(tail)
+        values = table.round(4).astype(object).where(table.notna(), None)
+        return jsonify({"symbol": symbol, "interval": interval, "indicator": name,
+                        "lengths": lengths, "time": table.index.tolist(),
+                        "values": values.to_numpy().tolist()})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"market_cache": market_cache.stats(),
+                    "single_flight": _inflight.stats,
+                    "firestore_writes": firebase_store.writes_report(),
+                    "persist_queue": persist_queue.metrics()})
+
 @app.route("/health", methods=["GET"])
 @app.route("/stocks", methods=["GET"])
 def stocks():
@@ -0,0 +1,207 @@
+"""
+backfill.py – Parallel chunked historical backfill
+Splits a (symbol, interval, start, end) range into chunks the history API
+accepts in one call, fetches them on a thread pool under a shared rate limit,
+and merges every chunk into the local OHLCV store through the data-quality
+stage (which deduplicates and repairs it). Finished chunks are checkpointed so an interrupted run resumes
+where it stopped.
+
+FYERS caps a history call at 100 days for minute resolutions and 366 days
+for daily bars (market_data.plan_chunks).
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import data_quality
+import ohlcv_store
+from market_data import FyersProvider, plan_chunks
+from market_hours import IST
+
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 8.0     # history calls per second across all workers
+MAX_ATTEMPTS = 3
+
+CHECKPOINT_DIR = os.environ.get(
+    "BACKFILL_CHECKPOINT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "backfill"),
+)
+
+
+def chunk_key(chunk) -> str:
+    return f"{chunk[0]:%Y-%m-%d}:{chunk[1]:%Y-%m-%d}"
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by all workers hitting one API."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """Set of finished chunk keys for one series, persisted after every chunk."""
+
+    def __init__(self, provider: str, symbol: str, interval: str, root: str = CHECKPOINT_DIR):
+        self.path = os.path.join(root, provider, symbol, f"{interval}.json")
+        self._lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.done = set(json.load(f).get("done", []))
+
+    def mark(self, key: str):
+        with self._lock:
+            self.done.add(key)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"done": sorted(self.done)}, f)
+            os.replace(tmp, self.path)
+
+
+def _fetch_chunk(provider, symbol, interval, chunk, limiter):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        limiter.acquire()
+        try:
+            return provider.history(symbol, interval, start=chunk[0],
+                                    end=chunk[1] + pd.Timedelta(days=1) - pd.Timedelta(seconds=1))
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            print(f"[RETRY] {symbol} {interval} {chunk_key(chunk)}: {e}")
+            time.sleep(2 ** attempt)
+
+
+def backfill_universe(symbols, interval: str, start, end=None, provider=None,
+                      workers: int = DEFAULT_WORKERS, limiter: RateLimiter = None) -> dict:
+    """
+    Fill the local store for every symbol over [start, end]. All pending
+    (symbol, chunk) pairs share one worker pool and one rate limiter; each
+    symbol keeps its own checkpoint. Returns per-symbol stats plus totals.
+    """
+    provider = provider or FyersProvider()
+    limiter = limiter or RateLimiter(DEFAULT_RATE)
+    end = pd.Timestamp.now(tz=IST) if end is None else end
+    today = pd.Timestamp.now(tz=IST).normalize()
+    planned = plan_chunks(start, end, interval)
+
+    checkpoints, per_symbol, tasks = {}, {}, []
+    for symbol in symbols:
+        checkpoints[symbol] = Checkpoint(provider.name, symbol, interval)
+        pending = [c for c in planned if chunk_key(c) not in checkpoints[symbol].done]
+        per_symbol[symbol] = {"chunks": len(pending), "skipped": len(planned) - len(pending),
+                              "failed": 0, "empty": 0, "bars": 0, "bytes": 0}
+        tasks.extend((symbol, c) for c in pending)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_fetch_chunk, provider, symbol, interval, c, limiter): (symbol, c)
+            for symbol, c in tasks
+        }
+        for future in as_completed(futures):
+            symbol, chunk = futures[future]
+            stats = per_symbol[symbol]
+            try:
+                df = future.result()
+            except Exception as e:
+                print(f"[FAILED] {symbol} {interval} {chunk_key(chunk)}: {e}")
+                stats["failed"] += 1
+                continue
+            stats["bars"] += data_quality.ingest(symbol, interval, df)
+            stats["bytes"] += int(df.memory_usage(index=True).sum())
+            # A chunk reaching today is still growing, so it is never final. An
+            # empty one may be a failure the provider did not raise (yfinance
+            # returns an empty frame), so it is fetched again on resume
+            if df.empty:
+                stats["empty"] += 1
+            elif chunk[1] < today:
+                checkpoints[symbol].mark(chunk_key(chunk))
+    elapsed = time.perf_counter() - started
+
+    bars = sum(s["bars"] for s in per_symbol.values())
+    return {
+        "symbols": per_symbol,
+        "interval": interval,
+        "chunks": len(tasks),
+        "failed": sum(s["failed"] for s in per_symbol.values()),
+        "empty": sum(s["empty"] for s in per_symbol.values()),
+        "bars": bars,
+        "bytes_fetched": sum(s["bytes"] for s in per_symbol.values()),
+        "bytes_stored": sum(ohlcv_store.series_bytes(sym, interval) for sym in symbols),
+        "seconds": round(elapsed, 2),
+        "bars_per_sec": round(bars / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def backfill(symbol: str, interval: str, start, end=None, provider=None,
+             workers: int = DEFAULT_WORKERS, limiter: RateLimiter = None) -> dict:
+    """Fill the local store for one series over [start, end]; see backfill_universe."""
+    report = backfill_universe([symbol], interval, start, end, provider, workers, limiter)
+    return dict(report["symbols"][symbol], symbol=symbol, interval=interval)
+
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from market_data import get_provider
+    from stocks_list import STOCKS
+
+    parser = argparse.ArgumentParser(description="Backfill the local OHLCV store.")
+    parser.add_argument("--symbols", help="comma-separated symbols (default: stocks_list.STOCKS)")
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--provider", default="fyers", help="fyers | yfinance | replay")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="API calls per second")
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(",") if args.symbols else STOCKS
+    report = backfill_universe(
+        symbols, args.interval, args.start, args.end,
+        provider=get_provider(args.provider),
+        workers=args.workers,
+        limiter=RateLimiter(args.rate),
+    )
+
+    for symbol, stats in report["symbols"].items():
+        print(f"{symbol:16s} {stats['bars']:>9d} bars  {stats['chunks']:>4d} chunks  "
+              f"{stats['skipped']:>4d} resumed  {stats['failed']:>3d} failed  {stats['empty']:>3d} empty")
+    print(f"\n{len(symbols)} symbols, {report['chunks']} chunks, {report['failed']} failed, "
+          f"{report['empty']} empty (not checkpointed) "
+          f"in {report['seconds']}s")
+    print(f"Throughput: {report['bars_per_sec']} bars/sec, "
+          f"{_format_bytes(report['bytes_fetched'] / max(report['seconds'], 1e-9))}/sec fetched")
+    print(f"Fetched {_format_bytes(report['bytes_fetched'])}, "
+          f"store now {_format_bytes(report['bytes_stored'])} for {args.interval}")
@@ -0,0 +1,111 @@
+"""
+bar_cache.py – Bar-boundary-aware TTL cache
+Entries expire exactly at the next candle close for their interval (NSE
+session aware, see market_hours), and are evicted least-recently-used first
+once the estimated memory footprint exceeds the cap.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from market_hours import next_bar_close, now_ist
+
+DEFAULT_MAX_MB = float(os.environ.get("MARKET_CACHE_MB", "256"))
+
+
+def estimate_size(value) -> int:
+    """Rough in-memory size in bytes of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        # records lists are homogeneous – measure one item and scale
+        return sys.getsizeof(value) + len(value) * estimate_size(value[0])
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class BarCache:
+
+    def __init__(self, max_mb: float = DEFAULT_MAX_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()   # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            value, expires_at, size = entry
+            if now_ist() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value, interval: str, expires_at: pd.Timestamp = None):
+        """
+        Store value until the next close of an `interval` bar. Pass the
+        `expires_at` taken before the value was computed, so a computation
+        that straddles a bar close cannot outlive the bar its data is from.
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return value
+        if expires_at is None:
+            expires_at = next_bar_close(interval)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._evictions += 1
+        return value
+
+    def get_or_compute(self, key, interval: str, fn, *args, **kwargs):
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            expires_at = next_bar_close(interval)
+            value = self.put(key, fn(*args, **kwargs), interval, expires_at)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
@@ -0,0 +1,116 @@
+"""
+bench_indicators.py – Indicator throughput on long series
+Times the shared indicator library under both backends (numba kernels and
+the NumPy/pandas fallback) against the paths it replaced:
+
+    chart set    SMA20, EMA9, RSI14, MACD(12,26,9), BB(20,2)
+                 legacy: pandas_ta, as fetch_ohlcv/finalize_ohlcv computed it
+    agent tools  RSI14, MACD(12,26,9), STOCH(14,3,3), ROC10, WILLR14
+                 legacy: talib on pandas Series, as the graph_util tools did
+
+    python bench_indicators.py                    1M bars, best of 3
+    python bench_indicators.py --bars 250000 --repeat 5
+
+Legacy paths are skipped when pandas_ta / talib are not installed, the numba
+backend when numba is not.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+def make_series(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1500 * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+    spread = close * np.abs(rng.normal(0, 0.0005, n))
+    index = pd.date_range("2020-01-01 09:15", periods=n, freq="1min")
+    return pd.DataFrame({"open": close, "high": close + spread, "low": close - spread,
+                         "close": close, "volume": 1000.0}, index=index)
+
+
+def chart_library(df):
+    return indicators.chart_indicators(df["close"])
+
+
+def tools_library(df):
+    high, low, close = df["high"], df["low"], df["close"]
+    return (indicators.rsi(close, 14), indicators.macd(close, 12, 26, 9),
+            indicators.stoch(high, low, close, 14, 3, 3), indicators.roc(close, 10),
+            indicators.willr(high, low, close, 14))
+
+
+def chart_pandas_ta(df):
+    import pandas_ta as ta
+    close = df["close"]
+    return (ta.sma(close, length=20), ta.ema(close, length=9), ta.rsi(close, length=14),
+            ta.macd(close), ta.bbands(close, length=20, std=2))
+
+
+def tools_talib(df):
+    import talib
+    high, low, close = df["high"], df["low"], df["close"]
+    return (talib.RSI(close, timeperiod=14),
+            talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9),
+            talib.STOCH(high, low, close, fastk_period=14, slowk_period=3, slowd_period=3),
+            talib.ROC(close, timeperiod=10), talib.WILLR(high, low, close, timeperiod=14))
+
+
+def _available(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def best_of(fn, df, repeat: int) -> float:
+    fn(df.iloc[:1000])                  # warm-up (JIT compile, imports)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_series(args.bars)
+    backends = ["numba", "numpy"] if indicators.njit is not None else ["numpy"]
+    initial = indicators.BACKEND
+    suites = [
+        ("chart set", chart_library, "pandas_ta", chart_pandas_ta),
+        ("agent tools", tools_library, "talib", tools_talib),
+    ]
+
+    print(f"{args.bars:,} bars, best of {args.repeat}")
+    print(f"{'suite':<12} {'path':<10} {'seconds':>9} {'Mbars/s':>9} {'vs legacy':>10}")
+    try:
+        for suite, library_fn, legacy, legacy_fn in suites:
+            rows = []
+            for backend in backends:
+                indicators.use_backend(backend)
+                rows.append((backend, best_of(library_fn, df, args.repeat)))
+            baseline = best_of(legacy_fn, df, args.repeat) if _available(legacy) else None
+            if baseline is not None:
+                rows.append((legacy, baseline))
+            for path, seconds in rows:
+                ratio = f"{baseline / seconds:.1f}x" if baseline else "-"
+                print(f"{suite:<12} {path:<10} {seconds:>9.3f} {args.bars / seconds / 1e6:>9.2f} {ratio:>10}")
+            if baseline is None:
+                print(f"{suite:<12} {legacy:<10} {'(not installed)':>20}")
+    finally:
+        indicators.use_backend(initial)
+
+
+if __name__ == "__main__":
+    main()
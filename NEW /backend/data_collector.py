@@ -1,18 +1,214 @@
+import asyncio
+import sys
 import time
+import pandas as pd
 from stocks_list import STOCKS
-from app import fetch_ohlcv
+import firebase_store
+import panel
+import shm_store
+from app import fetch_ohlcv, finalize_ohlcv, load_ohlcv_batch, provider
+from market_hours import next_bar_close, now_ist
 
 INTERVAL = "5m"
+BAR_SECONDS = 300
+BATCH_SIZE = 25   # tickers per grouped yfinance request
 
-while True:
+MAX_CONCURRENCY = 8        # symbol fetches in flight at once
+RATE_LIMITS = {"yfinance": 4.0, "fyers": 10.0, "replay": 1000.0}   # requests/second per data source
+SETTLE_SECONDS = 3         # wait after a bar close so the provider has published it
+MAX_BACKOFF_SECONDS = 3600
 
-    for stock in STOCKS:
+
+def writes_line() -> str:
+    """Firestore writes of the cycle that just ended (resets the counters)."""
+    w = firebase_store.writes_report(reset=True)
+    return (f"firestore {w['written']} candles written / {w['skipped']} unchanged "
+            f"({w['saved_pct']:.0f}% saved) in {w['doc_writes']} day docs, {w['doc_reads']} reads")
+
+
+def publish(stock, interval, df):
+    """Hand a finalized frame to the API workers through shared memory."""
+    try:
+        shm_store.publish(stock, interval, df)
+    except Exception as e:
+        print("Error: shared-memory publish", stock, e)
+
+
+def collect_serial(symbols, interval=INTERVAL):
+    for stock in symbols:
 
         try:
             print("Fetching:", stock)
-            fetch_ohlcv(stock, INTERVAL)
+            publish(stock, interval, fetch_ohlcv(stock, interval))
 
         except Exception as e:
             print("Error:", stock, e)
 
-    time.sleep(300)
\ No newline at end of file
+
+def collect_batched(symbols, interval=INTERVAL, batch_size=BATCH_SIZE):
+    """
+    One collection cycle: a few grouped multi-ticker downloads, one panel
+    indicator pass per batch, then the storage stage per symbol. Returns
+    per-stage timings in seconds.
+    """
+    timings = {"download": 0.0, "process": 0.0, "symbols": 0, "errors": 0}
+
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i:i + batch_size]
+
+        t0 = time.perf_counter()
+        try:
+            frames = load_ohlcv_batch(batch, interval)
+        except Exception as e:
+            print("Error: batch", batch[0], "..", batch[-1], e)
+            timings["errors"] += len(batch)
+            continue
+        timings["download"] += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        universe = panel.Panel.from_frames(frames)
+        frames = universe.frames(panel.chart_indicators(universe))
+        for stock in batch:
+            df = frames.get(stock)
+            if df is None or df.empty:
+                print("Error:", stock, "no data")
+                timings["errors"] += 1
+                continue
+            try:
+                publish(stock, interval, finalize_ohlcv(stock, df, interval))
+                timings["symbols"] += 1
+            except Exception as e:
+                print("Error:", stock, e)
+                timings["errors"] += 1
+        timings["process"] += time.perf_counter() - t0
+
+    return timings
+
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class SymbolBackoff:
+    """Skips a symbol for exponentially longer after each consecutive failure."""
+
+    def __init__(self, base_seconds: float = BAR_SECONDS, max_seconds: float = MAX_BACKOFF_SECONDS):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self._failures = {}
+        self._retry_at = {}
+
+    def ready(self, symbol: str) -> bool:
+        return time.monotonic() >= self._retry_at.get(symbol, 0)
+
+    def success(self, symbol: str):
+        self._failures.pop(symbol, None)
+        self._retry_at.pop(symbol, None)
+
+    def failure(self, symbol: str) -> float:
+        n = self._failures.get(symbol, 0) + 1
+        self._failures[symbol] = n
+        delay = min(self.max_seconds, self.base_seconds * 2 ** (n - 1))
+        self._retry_at[symbol] = time.monotonic() + delay
+        return delay
+
+
+async def collect_async(symbols, interval=INTERVAL, limiter=None, backoff=None,
+                        concurrency=MAX_CONCURRENCY):
+    """
+    One cycle of per-symbol fetches run in worker threads, at most
+    `concurrency` at a time and paced by the data source's rate limiter.
+    """
+    limiter = limiter or RateLimiter(RATE_LIMITS.get(provider.name, 4.0))
+    backoff = backoff or SymbolBackoff()
+    semaphore = asyncio.Semaphore(concurrency)
+    result = {"symbols": 0, "errors": 0, "skipped": 0}
+
+    async def one(stock):
+        if not backoff.ready(stock):
+            result["skipped"] += 1
+            return
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                df = await asyncio.to_thread(fetch_ohlcv, stock, interval)
+                publish(stock, interval, df)
+                backoff.success(stock)
+                result["symbols"] += 1
+            except Exception as e:
+                delay = backoff.failure(stock)
+                result["errors"] += 1
+                print("Error:", stock, e, f"(backing off {delay:.0f}s)")
+
+    await asyncio.gather(*(one(stock) for stock in symbols))
+    return result
+
+
+async def run_scheduler(symbols, interval=INTERVAL):
+    """
+    Collect right after every bar close during NSE sessions. Outside market
+    hours next_bar_close() points at the first bar of the next session, so the
+    scheduler simply sleeps through nights, weekends and holidays.
+    """
+    limiter = RateLimiter(RATE_LIMITS.get(provider.name, 4.0))
+    backoff = SymbolBackoff()
+
+    while True:
+        bar_close = next_bar_close(interval)
+        fire_at = bar_close + pd.Timedelta(seconds=SETTLE_SECONDS)
+        wait = (fire_at - now_ist()).total_seconds()
+        if wait > 0:
+            print(f"[SCHEDULER] next collection at {fire_at:%Y-%m-%d %H:%M:%S} IST "
+                  f"(in {wait:.0f}s)")
+            await asyncio.sleep(wait)
+
+        started = time.perf_counter()
+        r = await collect_async(symbols, interval, limiter, backoff)
+        elapsed = time.perf_counter() - started
+        lag = (now_ist() - bar_close).total_seconds()
+        print(f"[SCHEDULER] cycle {elapsed:.1f}s, done {lag:.1f}s after bar close: "
+              f"{r['symbols']} ok, {r['errors']} failed, {r['skipped']} backing off; {writes_line()}")
+
+
+if __name__ == "__main__":
+
+    serial = "--serial" in sys.argv
+
+    # Default: market-hours-aware asyncio scheduler; --serial / --batched run
+    # the fixed 300s loop around the clock
+    if "--batched" not in sys.argv and not serial:
+        asyncio.run(run_scheduler(STOCKS))
+        sys.exit(0)
+
+    while True:
+
+        started = time.perf_counter()
+        if serial:
+            collect_serial(STOCKS)
+        else:
+            t = collect_batched(STOCKS)
+            elapsed = time.perf_counter() - started
+            status = "OK" if elapsed < BAR_SECONDS else "OVERRUN"
+            print(f"[{status}] cycle {elapsed:.1f}s / {BAR_SECONDS}s "
+                  f"(download {t['download']:.1f}s, process {t['process']:.1f}s, "
+                  f"{t['symbols']} ok, {t['errors']} failed; {writes_line()})")
+
+        time.sleep(max(0, BAR_SECONDS - (time.perf_counter() - started)))
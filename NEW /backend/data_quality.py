@@ -0,0 +1,173 @@
+"""
+data_quality.py – Ingest-time validation and repair for OHLCV candles
+Runs once when bars enter the local store (ingest()), never per request:
+
+    1. one tz-aware IST index; naive timestamps that only make sense as UTC
+       (e.g. 03:45 instead of 09:15) are shifted instead of trusted
+    2. duplicate timestamps dropped (last one wins)
+    3. bars outside NSE sessions (weekends, holidays, pre/post market) dropped
+    4. zero-volume prints with a flat O=H=L=C counted but kept: dropping them
+       would leave per-symbol holes in the aligned universe panels
+    5. isolated bad ticks – a rolling robust z-score spike that immediately
+       reverts – dropped. The statistics run over the stored tail plus the
+       batch, so a 1-3 bar top-up is judged against a full window, and a
+       stored bar the new bars expose as a spike is removed from the store
+    6. high/low widened to contain open/close
+    7. missing bars inside a session counted, and optionally filled with
+       flat zero-volume bars at the previous close
+
+Every step is a vectorized mask over the whole batch. The repaired frame is
+written to the store and the report is kept next to the series.
+"""
+
+import numpy as np
+import pandas as pd
+
+import ohlcv_store
+from market_hours import INTERVAL_MINUTES, IST, NSE_HOLIDAYS, SESSION_CLOSE, SESSION_OPEN, ensure_years
+
+ZSCORE_WINDOW = 50
+ZSCORE_THRESHOLD = 8.0
+
+_OPEN_MIN = SESSION_OPEN.hour * 60 + SESSION_OPEN.minute
+_CLOSE_MIN = SESSION_CLOSE.hour * 60 + SESSION_CLOSE.minute
+
+
+def _minutes_of_day(index: pd.DatetimeIndex) -> np.ndarray:
+    return np.asarray(index.hour * 60 + index.minute)
+
+
+def _trading_days(index: pd.DatetimeIndex) -> np.ndarray:
+    ensure_years(np.unique(index.year))    # e.g. backfilled years the built-in table lacks
+    dates = index.strftime("%Y-%m-%d")
+    return np.asarray(index.weekday < 5) & ~np.isin(dates, list(NSE_HOLIDAYS))
+
+
+def _in_session_share(index: pd.DatetimeIndex) -> float:
+    minutes = _minutes_of_day(index)
+    return float(np.mean((minutes >= _OPEN_MIN) & (minutes < _CLOSE_MIN)))
+
+
+def normalize_index(df: pd.DataFrame, interval: str):
+    """Return (df with an IST index, whether naive stamps were treated as UTC)."""
+    index = pd.DatetimeIndex(df.index)
+    shifted = False
+    if index.tz is None:
+        as_ist = index.tz_localize(IST)
+        if interval in INTERVAL_MINUTES and len(index):
+            as_utc = index.tz_localize("UTC").tz_convert(IST)
+            shifted = _in_session_share(as_utc) > _in_session_share(as_ist)
+        index = as_utc if shifted else as_ist
+    df = df.copy()
+    df.index = index.tz_convert(IST)
+    df.index.name = "time"
+    return df, bool(shifted)
+
+
+def session_mask(index: pd.DatetimeIndex, interval: str) -> np.ndarray:
+    """True for bars that open inside an NSE session."""
+    mask = _trading_days(index)
+    if interval in INTERVAL_MINUTES:
+        minutes = _minutes_of_day(index)
+        mask &= (minutes >= _OPEN_MIN) & (minutes < _CLOSE_MIN)
+    return mask
+
+
+def expected_bars(index: pd.DatetimeIndex, interval: str) -> pd.DatetimeIndex:
+    """Full session-anchored bar grid for every trading day the data spans."""
+    if not len(index):
+        return index
+    days = pd.date_range(index.min().normalize(), index.max().normalize(), freq="D")
+    days = days[_trading_days(days)]
+    if interval not in INTERVAL_MINUTES:
+        return days
+    width = INTERVAL_MINUTES[interval]
+    offsets = np.arange(_OPEN_MIN, _CLOSE_MIN, width) * 60 * 10**9
+    opens = days.tz_localize(None).as_unit("ns").asi8
+    grid = np.add.outer(opens, offsets).ravel()
+    return pd.DatetimeIndex(grid.astype("datetime64[ns]")).tz_localize(IST)
+
+
+def bad_tick_mask(close: pd.Series, window: int = ZSCORE_WINDOW,
+                  threshold: float = ZSCORE_THRESHOLD) -> np.ndarray:
+    """Bars whose log return is a robust-z outlier that the next bar undoes."""
+    r = np.log(close).diff()
+    med = r.rolling(window, min_periods=10).median()
+    mad = (r - med).abs().rolling(window, min_periods=10).median()
+    z = 0.6745 * (r - med) / mad.replace(0, np.nan)
+    z_next = z.shift(-1)
+    spike = (z.abs() > threshold) & (z_next.abs() > threshold / 2) & (np.sign(z) != np.sign(z_next))
+    return spike.fillna(False).to_numpy()
+
+
+def validate_and_repair(df: pd.DataFrame, interval: str, fill_gaps: bool = False,
+                        history: pd.DataFrame = None):
+    """
+    Return (repaired frame, quality report) for one batch of bars. `history`
+    (the stored bars before the batch) warms up the bad-tick statistics;
+    the times of all bad ticks, stored ones included, are in report["bad_times"].
+    """
+    if df is None or df.empty:
+        return df, {"rows_in": 0, "rows_out": 0}
+    report = {"rows_in": int(len(df))}
+
+    df, report["tz_shifted"] = normalize_index(df, interval)
+
+    dup = df.index.duplicated(keep="last")
+    report["duplicates"] = int(dup.sum())
+    df = df[~dup].sort_index()
+
+    inside = session_mask(df.index, interval)
+    report["outside_session"] = int((~inside).sum())
+    df = df[inside]
+
+    flat = (df["open"] == df["high"]) & (df["high"] == df["low"]) & (df["low"] == df["close"])
+    report["zero_volume"] = int((df["volume"] <= 0).sum())
+    report["flat_zero_prints"] = int(((df["volume"] <= 0) & flat).sum())
+
+    close = df["close"]
+    if history is not None and len(history) and len(df):
+        close = pd.concat([history["close"][history.index < df.index[0]], close])
+    bad = bad_tick_mask(close)
+    report["bad_ticks"] = int(bad.sum())
+    report["bad_times"] = [t.isoformat() for t in close.index[bad]]
+    df = df[~bad[len(close) - len(df):]].copy()
+
+    body_hi = df[["open", "close"]].max(axis=1)
+    body_lo = df[["open", "close"]].min(axis=1)
+    broken = (df["high"] < body_hi) | (df["low"] > body_lo)
+    report["ohlc_fixed"] = int(broken.sum())
+    df["high"] = np.maximum(df["high"], body_hi)
+    df["low"] = np.minimum(df["low"], body_lo)
+
+    grid = expected_bars(df.index, interval)
+    if len(df):
+        grid = grid[(grid >= df.index[0]) & (grid <= df.index[-1])]
+    missing = grid.difference(df.index)
+    report["gaps"] = int(len(missing))
+    report["gaps_filled"] = 0
+    if fill_gaps and len(missing):
+        prev_close = df["close"].reindex(df.index.union(missing)).ffill().reindex(missing)
+        prev_close = prev_close.dropna()
+        filler = pd.DataFrame({c: prev_close for c in ("open", "high", "low", "close")},
+                              index=prev_close.index)
+        filler["volume"] = 0.0
+        df = pd.concat([df, filler]).sort_index()
+        report["gaps_filled"] = int(len(filler))
+
+    report["rows_out"] = int(len(df))
+    return df, report
+
+
+def ingest(symbol: str, interval: str, df: pd.DataFrame, fill_gaps: bool = False) -> int:
+    """Validate/repair a batch, append it to the store and persist its report."""
+    if df is None or df.empty:
+        return 0
+    history = ohlcv_store.tail_bars(symbol, interval, ZSCORE_WINDOW + 1)
+    df, report = validate_and_repair(df, interval, fill_gaps=fill_gaps, history=history)
+    # The upsert only replaces bars; a stored bar now known to be bad must be removed
+    if report.get("bad_times"):
+        ohlcv_store.drop_bars(symbol, interval, pd.DatetimeIndex(report["bad_times"]))
+    written = ohlcv_store.append_bars(symbol, interval, df)
+    ohlcv_store.record_quality(symbol, interval, report)
+    return written
@@ -5,6 +5,7 @@ DEFAULT_CONFIG = {
     "graph_llm_provider": "google",  # "openai", "anthropic", or "qwen"
     "agent_llm_temperature": 0.1,
     "graph_llm_temperature": 0.1,
+    "inline_indicators": False,  # put precomputed indicators in the prompt instead of tool calls
     "api_key": "sk-",  # OpenAI API key
     "anthropic_api_key": "sk-",  # Anthropic API key (optional, can also use ANTHROPIC_API_KEY env var)
     "qwen_api_key": "sk-",  # Qwen API key (optional, can also use DASHSCOPE_API_KEY env var)
@@ -1,8 +1,43 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+"""
+firebase_config.py – Lazy Firestore client
+Nothing connects at import time, so the backend starts without credentials
+or network; the client is created on first use of get_db() (or of `db`).
+"""
 
-cred = credentials.Certificate("firebase_key.json")
+import os
+import threading
 
-firebase_admin.initialize_app(cred)
+KEY_PATH = os.environ.get("FIREBASE_KEY", "firebase_key.json")
 
-db = firestore.client()
\ No newline at end of file
+_db = None
+_lock = threading.Lock()
+
+
+def configured() -> bool:
+    """True if Firebase credentials are present and firebase_admin is installed."""
+    try:
+        import firebase_admin  # noqa: F401
+    except ImportError:
+        return False
+    return os.path.exists(KEY_PATH)
+
+
+def get_db():
+    global _db
+    with _lock:
+        if _db is None:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+            try:
+                firebase_admin.get_app()
+            except ValueError:
+                firebase_admin.initialize_app(credentials.Certificate(KEY_PATH))
+            _db = firestore.client()
+        return _db
+
+
+def __getattr__(name):
+    # `from firebase_config import db` keeps working, connecting on first use
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module 'firebase_config' has no attribute '{name}'")
@@ -1,15 +1,222 @@
-from firebase_config import db
+"""
+firebase_store.py – Candle persistence
+One document per (symbol, interval, trading day) holding the day's candles
+as columnar arrays, instead of one document per candle. Documents go to the
+configured storage backend (storage.py: Firestore, local SQLite, or SQLite
+as a read-through cache in front of Firestore):
 
-def store_stock_data(symbol, df):
+    stocks/{symbol}/intervals/{interval}/candles/{2025-01-06}
+        {"day": "2025-01-06", "t0": <epoch s of the day's 00:00 IST>,
+         "dt": [33300, 33600, ...],              seconds after t0
+         "open": [...], "high": [...], ..., "SMA": [...], ...,   null = NaN
+         "columns": [...], "bars": 75}
 
+Daily and longer intervals are grouped per year ("2025"), as in the local
+store. A day of 1m bars is one read and one write instead of 375.
+
+Writes are diff-only and batched. Each series keeps a high-water mark plus
+the signatures of its most recent candles, so only candles that are new or
+changed (the forming bar, late corrections) are written – merged into their
+day's document, which for the current day is kept in memory (append path)
+and otherwise read once. Firestore commits them in WriteBatches of up to
+500. writes_report() counts candles offered / written / unchanged and the
+document reads and writes behind them.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import storage as storage_backends
+from market_hours import IST
+
+TRACK_RECENT = 50     # newest candles per series remembered for change detection
+CACHED_DAYS = 2       # newest day documents per series kept in memory
+
+_YEARLY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+_series = {}          # (symbol, interval) -> {"hwm", "recent": {time: signature}, "days": {key: frame}}
+_locks = {}
+_locks_guard = threading.Lock()
+_storage = None
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "candles": 0, "written": 0, "skipped": 0,
+          "doc_writes": 0, "doc_reads": 0, "commits": 0}
+
+
+def _series_lock(key) -> threading.Lock:
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        return _locks[key]
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for k, v in deltas.items():
+            _stats[k] += v
+
+
+def storage() -> storage_backends.CandleStorage:
+    """The storage backend, created on first use (storage.get_storage())."""
+    global _storage
+    with _locks_guard:
+        if _storage is None:
+            _storage = storage_backends.get_storage()
+        return _storage
+
+
+def use_storage(backend: storage_backends.CandleStorage):
+    """Swap the backend, e.g. a SQLiteStorage for tests and benchmarks."""
+    global _storage
+    with _locks_guard:
+        _storage = backend
+        _series.clear()
+
+
+# ── Document schema ─────────────────────────────────────────────────────────
+
+
+def _to_ist(times) -> pd.DatetimeIndex:
+    idx = pd.DatetimeIndex(pd.to_datetime(times))
+    return idx.tz_localize(IST) if idx.tz is None else idx.tz_convert(IST)
+
+
+def partition_keys(index: pd.DatetimeIndex, interval: str) -> pd.Index:
+    fmt = "%Y" if interval in _YEARLY_INTERVALS else "%Y-%m-%d"
+    return pd.Index(index.strftime(fmt))
+
+
+def _partition_start(key: str) -> pd.Timestamp:
+    return pd.Timestamp(key if len(key) > 4 else f"{key}-01-01", tz=IST)
+
+
+def encode_day(key: str, frame: pd.DataFrame) -> dict:
+    """Columnar document for one partition (`frame` indexed by IST bar time)."""
+    t0 = _partition_start(key)
+    doc = {
+        "day": key,
+        "t0": int(t0.timestamp()),
+        "dt": ((frame.index - t0) // pd.Timedelta(seconds=1)).astype(int).tolist(),
+        "columns": list(frame.columns),
+        "bars": len(frame),
+    }
+    for col in frame.columns:
+        values = frame[col].to_numpy(dtype=np.float64)
+        doc[col] = [None if np.isnan(v) else float(v) for v in values]
+    return doc
+
+
+def decode_day(doc: dict) -> pd.DataFrame:
+    """Inverse of encode_day: frame indexed by IST bar time."""
+    index = pd.to_datetime(np.asarray(doc["t0"] + np.asarray(doc["dt"], dtype=np.int64)), unit="s", utc=True)
+    data = {c: np.array(doc[c], dtype=np.float64) for c in doc["columns"]}
+    return pd.DataFrame(data, index=pd.DatetimeIndex(index).tz_convert(IST))
+
+
+# ── Writes ──────────────────────────────────────────────────────────────────
+
+def _signature(record: dict) -> tuple:
+    return tuple((k, None if pd.isna(v) else v) for k, v in record.items())
+
+
+def _pending(state: dict, records: list, times: pd.DatetimeIndex) -> list:
+    """(position, signature) of the candles that need a write."""
+    hwm, recent = state["hwm"], state["recent"]
+    pending = []
+    for i, (r, t) in enumerate(zip(records, times)):
+        sig = _signature(r)
+        if hwm is None or t > hwm or (t in recent and recent[t] != sig):
+            pending.append((i, sig))
+    return pending
+
+
+def _day_frame(state: dict, symbol: str, interval: str, key: str) -> pd.DataFrame:
+    """A partition's stored candles: from memory for recent days, else one read."""
+    if key in state["days"]:
+        return state["days"][key]
+    _count(doc_reads=1)
+    doc = storage().get_day(symbol, interval, key)
+    return decode_day(doc) if doc else None
+
+
+def _remember(state: dict, times, signatures, days: dict):
+    recent = state["recent"]
+    for t, sig in zip(times, signatures):
+        recent[t] = sig
+        recent.move_to_end(t)
+        if state["hwm"] is None or t > state["hwm"]:
+            state["hwm"] = t
+    while len(recent) > TRACK_RECENT:
+        recent.popitem(last=False)
+    state["days"].update(days)
+    for key in sorted(state["days"])[:-CACHED_DAYS]:
+        del state["days"][key]
+
+
+def store_stock_data(symbol, df, interval=None) -> dict:
+    """
+    Persist the candles of `df` (with a `time` column) that are new or changed
+    since the last call for this series. Returns {"written", "skipped", "docs"}.
+    """
+    if df.empty:
+        return {"written": 0, "skipped": 0, "docs": 0}
+    key = (symbol, interval)
     records = df.to_dict(orient="records")
+    times = _to_ist(df["time"])
+
+    with _series_lock(key):
+        state = _series.setdefault(key, {"hwm": None, "recent": OrderedDict(), "days": {}})
+        pending = _pending(state, records, times)
+        rows = [i for i, _ in pending]
+        fresh = df.iloc[rows].drop(columns="time").set_axis(times[rows])
+
+        days = {}
+        for day, part in fresh.groupby(partition_keys(fresh.index, interval)):
+            stored = _day_frame(state, symbol, interval, day)
+            if stored is not None:
+                part = pd.concat([stored[~stored.index.isin(part.index)], part]).sort_index()
+            days[day] = part
+
+        written = docs = commits = 0
+        try:
+            if days:
+                commits = storage().put_days(symbol, interval, {day: encode_day(day, f) for day, f in days.items()})
+                written, docs = len(pending), len(days)
+                _remember(state, fresh.index, [sig for _, sig in pending], days)
+        finally:
+            _count(calls=1, candles=len(records), written=written, skipped=len(records) - len(pending),
+                   doc_writes=docs, commits=commits)
+    return {"written": written, "skipped": len(records) - len(pending), "docs": docs}
+
+
+def writes_report(reset: bool = False) -> dict:
+    """Candles offered / written / unchanged and document reads/writes since the last reset."""
+    with _stats_lock:
+        report = dict(_stats)
+        if reset:
+            for k in _stats:
+                _stats[k] = 0
+    report["saved_pct"] = round(100.0 * report["skipped"] / report["candles"], 1) if report["candles"] else 0.0
+    return report
 
-    for r in records:
 
-        doc_id = str(r["time"])
+# ── Reads ───────────────────────────────────────────────────────────────────
 
-        db.collection("stocks") \
-          .document(symbol) \
-          .collection("ohlcv") \
-          .document(doc_id) \
-          .set(r)
\ No newline at end of file
+def read_series(symbol: str, interval: str, start=None) -> pd.DataFrame:
+    """
+    Stored candles of a series (optionally from `start` on) as a frame with a
+    `time` column in the same string form the API serves – one read per day.
+    """
+    first = partition_keys(_to_ist([start]), interval)[0] if start is not None else None
+    frames = [decode_day(doc) for doc in storage().days(symbol, interval, first)]
+    _count(doc_reads=len(frames))
+    if not frames:
+        return pd.DataFrame(columns=["time"])
+    df = pd.concat(frames).sort_index()
+    if start is not None:
+        df = df[df.index >= _to_ist([start])[0]]
+    df.insert(0, "time", df.index.astype(str))
+    return df.reset_index(drop=True)
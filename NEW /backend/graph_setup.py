@@ -8,7 +8,7 @@ from langgraph.prebuilt import ToolNode
 from agent_state import IndicatorAgentState
 from decision_agent import create_final_trade_decider
 from graph_util import TechnicalTools
-from indicator_agent import create_indicator_agent
+from indicator_agent import create_indicator_agent, create_indicator_bundle_node
 from pattern_agent import create_pattern_agent
 from trend_agent import create_trend_agent
 
@@ -20,10 +20,12 @@ class SetGraph:
         graph_llm,
         toolkit: TechnicalTools,
         # tool_nodes: Dict[str, ToolNode],
+        inline_indicators: bool = False,
     ):
         self.agent_llm = agent_llm
         self.graph_llm = graph_llm
         self.toolkit = toolkit
+        self.inline_indicators = inline_indicators
         # self.tool_nodes = tool_nodes
 
     def set_graph(self):
@@ -33,7 +35,9 @@ class SetGraph:
         all_agents = ["indicator", "pattern", "trend"]
 
         # create nodes for indicator agent
-        agent_nodes["indicator"] = create_indicator_agent(self.graph_llm, self.toolkit)
+        agent_nodes["indicator"] = create_indicator_agent(
+            self.graph_llm, self.toolkit, self.inline_indicators
+        )
         # tool_nodes["indicator"] = self.tool_nodes["indicator"]
 
         # create nodes for pattern agent
@@ -59,10 +63,12 @@ class SetGraph:
             graph.add_node(f"{agent_type.capitalize()} Agent", cur_node)
 
         # add rest of the nodes
+        graph.add_node("Indicator Bundle", create_indicator_bundle_node())
         graph.add_node("Decision Maker", decision_agent_node)
 
-        # set start of graph
-        graph.add_edge(START, "Indicator Agent")
+        # set start of graph: indicators are computed once, before any agent
+        graph.add_edge(START, "Indicator Bundle")
+        graph.add_edge("Indicator Bundle", "Indicator Agent")
 
         # add edges to graph
         for i, agent_type in enumerate(all_agents):
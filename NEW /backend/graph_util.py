@@ -7,10 +7,10 @@ import matplotlib.pyplot as plt
 import mplfinance as mpf
 import numpy as np
 import pandas as pd
-import talib
 from langchain_core.tools import tool
 
 import color_style as color
+import indicators
 
 matplotlib.use("Agg")
 
@@ -144,8 +144,92 @@ def split_line_into_segments(line_points):
     return [[line_points[i], line_points[i + 1]] for i in range(len(line_points) - 1)]
 
 
-# Calculate MACD using TA-Lib
-# Typical parameters: fastperiod=12, slowperiod=26, signalperiod=9
+# Indicator tools use the shared indicators module, so the agents see the
+# same values as the chart and the ML features.
+# Typical MACD parameters: fastperiod=12, slowperiod=26, signalperiod=9
+
+INDICATOR_TAIL = 28   # values per indicator handed to the LLM
+
+
+def kline_frame(kline_data: dict) -> pd.DataFrame:
+    """
+    Float OHLCV frame with Open/High/Low/Close/Volume columns from either
+    column-oriented ({"Close": [...]}) or time-keyed ({time: {"close": ...}})
+    kline data.
+    """
+    df = pd.DataFrame(kline_data)
+    if not {"Close", "close"} & set(df.columns):
+        df = df.T
+    df = df.rename(columns=str.capitalize)
+    cols = [c for c in ("Open", "High", "Low", "Close", "Volume") if c in df.columns]
+    return df[cols].astype(float)
+
+
+def _tail(values, n=INDICATOR_TAIL) -> list:
+    values = pd.Series(values).fillna(0).round(2).tolist()
+    return values[-n:] if n else values
+
+
+def _rsi(df, period=14):
+    return {"rsi": _tail(indicators.rsi(df["Close"], period))}
+
+
+def _macd(df, fastperiod=12, slowperiod=26, signalperiod=9):
+    macd, macd_signal, macd_hist = indicators.macd(df["Close"], fastperiod, slowperiod, signalperiod)
+    return {
+        "macd": _tail(macd, None),
+        "macd_signal": _tail(macd_signal),
+        "macd_hist": _tail(macd_hist),
+    }
+
+
+def _stoch(df):
+    stoch_k, stoch_d = indicators.stoch(df["High"], df["Low"], df["Close"], 14, 3, 3)
+    return {"stoch_k": _tail(stoch_k), "stoch_d": _tail(stoch_d)}
+
+
+def _roc(df, period=10):
+    return {"roc": _tail(indicators.roc(df["Close"], period))}
+
+
+def _willr(df, period=14):
+    return {"willr": _tail(indicators.willr(df["High"], df["Low"], df["Close"], period))}
+
+
+# tool name -> (implementation, default arguments, output keys)
+INDICATOR_TOOLS = {
+    "compute_rsi": (_rsi, {"period": 14}, ("rsi",)),
+    "compute_macd": (_macd, {"fastperiod": 12, "slowperiod": 26, "signalperiod": 9},
+                     ("macd", "macd_signal", "macd_hist")),
+    "compute_stoch": (_stoch, {}, ("stoch_k", "stoch_d")),
+    "compute_roc": (_roc, {"period": 10}, ("roc",)),
+    "compute_willr": (_willr, {"period": 14}, ("willr",)),
+}
+BUNDLE_KEYS = [key for _, _, keys in INDICATOR_TOOLS.values() for key in keys]
+
+
+def compute_indicator_bundle(kline_data: dict) -> dict:
+    """Every indicator tool's default output, computed once from one frame."""
+    df = kline_frame(kline_data)
+    bundle = {}
+    for fn, defaults, _ in INDICATOR_TOOLS.values():
+        bundle.update(fn(df, **defaults))
+    return bundle
+
+
+def bundle_lookup(bundle: dict, tool_name: str, args: dict):
+    """
+    The tool's result from a precomputed bundle, or None when the call asks
+    for non-default periods (or the bundle lacks it) and must be computed.
+    """
+    if tool_name not in INDICATOR_TOOLS:
+        return None
+    _, defaults, keys = INDICATOR_TOOLS[tool_name]
+    if any(k != "kline_data" and defaults.get(k, v) != v for k, v in args.items()):
+        return None
+    if any(bundle.get(key) is None for key in keys):
+        return None
+    return {key: bundle[key] for key in keys}
 
 
 class TechnicalTools:
@@ -329,7 +413,7 @@ class TechnicalTools:
         ] = 14,
     ) -> dict:
         """
-        Compute the Relative Strength Index (RSI) using TA-Lib.
+        Compute the Relative Strength Index (RSI).
 
         Args:
             data (dict): Dictionary containing at least a 'Close' key with a list of float values.
@@ -338,9 +422,7 @@ class TechnicalTools:
         Returns:
             dict: A dictionary with a single key 'rsi' mapping to a list of RSI values.
         """
-        df = pd.DataFrame(kline_data)
-        rsi = talib.RSI(df["Close"], timeperiod=period)
-        return {"rsi": rsi.fillna(0).round(2).tolist()[-28:]}
+        return _rsi(kline_frame(kline_data), period)
 
     @staticmethod
     @tool
@@ -354,7 +436,7 @@ class TechnicalTools:
         signalperiod: Annotated[int, "Signal line EMA period"] = 9,
     ) -> dict:
         """
-        Compute the Moving Average Convergence Divergence (MACD) using TA-Lib.
+        Compute the Moving Average Convergence Divergence (MACD).
 
         Args:
             kline_data (dict): Dictionary containing a 'Close' key with list of float values.
@@ -365,18 +447,7 @@ class TechnicalTools:
         Returns:
             dict: Dictionary containing 'macd', 'macd_signal', and 'macd_hist' as lists of values.
         """
-        df = pd.DataFrame(kline_data)
-        macd, macd_signal, macd_hist = talib.MACD(
-            df["Close"],
-            fastperiod=fastperiod,
-            slowperiod=slowperiod,
-            signalperiod=signalperiod,
-        )
-        return {
-            "macd": macd.fillna(0).round(2).tolist(),
-            "macd_signal": macd_signal.fillna(0).round(2).tolist()[-28:],
-            "macd_hist": macd_hist.fillna(0).round(2).tolist()[-28:],
-        }
+        return _macd(kline_frame(kline_data), fastperiod, slowperiod, signalperiod)
 
     @staticmethod
     @tool
@@ -387,7 +458,7 @@ class TechnicalTools:
         ]
     ) -> dict:
         """
-        Compute the Stochastic Oscillator %K and %D using TA-Lib.
+        Compute the Stochastic Oscillator %K and %D.
 
         Args:
             kline_data (dict): Dictionary with 'High', 'Low', and 'Close' keys, each mapping to lists of float values.
@@ -396,19 +467,7 @@ class TechnicalTools:
             dict: A dictionary with keys 'stoch_k' and 'stoch_d',
                 each mapping to a list representing %K and %D values.
         """
-        df = pd.DataFrame(kline_data)
-        stoch_k, stoch_d = talib.STOCH(
-            df["High"],
-            df["Low"],
-            df["Close"],
-            fastk_period=14,
-            slowk_period=3,
-            slowd_period=3,
-        )
-        return {
-            "stoch_k": stoch_k.fillna(0).round(2).tolist()[-28:],
-            "stoch_d": stoch_d.fillna(0).round(2).tolist()[-28:],
-        }
+        return _stoch(kline_frame(kline_data))
 
     @staticmethod
     @tool
@@ -422,7 +481,7 @@ class TechnicalTools:
         ] = 10,
     ) -> dict:
         """
-        Compute the Rate of Change (ROC) indicator using TA-Lib.
+        Compute the Rate of Change (ROC) indicator.
 
         Args:
             kline_data (dict): Dictionary containing a 'Close' key with a list of float values.
@@ -432,9 +491,7 @@ class TechnicalTools:
             dict: A dictionary with a single key 'roc' mapping to a list of ROC values.
         """
 
-        df = pd.DataFrame(kline_data)
-        roc = talib.ROC(df["Close"], timeperiod=period)
-        return {"roc": roc.fillna(0).round(2).tolist()[-28:]}
+        return _roc(kline_frame(kline_data), period)
 
     @staticmethod
     @tool
@@ -446,7 +503,7 @@ class TechnicalTools:
         period: Annotated[int, "Lookback period for Williams %R"] = 14,
     ) -> dict:
         """
-        Compute the Williams %R indicator using TA-Lib.
+        Compute the Williams %R indicator.
 
         Args:
             kline_data (dict): Dictionary with 'High', 'Low', and 'Close' keys.
@@ -456,6 +513,4 @@ class TechnicalTools:
             dict: Dictionary with key 'willr' mapping to the list of Williams %R values.
         """
         # print("-------------------------CALLED COMPUTE WILLR--------------------------\n")
-        df = pd.DataFrame(kline_data)
-        willr = talib.WILLR(df["High"], df["Low"], df["Close"], timeperiod=period)
-        return {"willr": willr.fillna(0).round(2).tolist()[-28:]}
+        return _willr(kline_frame(kline_data), period)
@@ -3,19 +3,76 @@ Agent for technical indicator analysis in high-frequency trading (HFT) context.
 Uses LLM and toolkit to compute and interpret indicators like MACD, RSI, ROC, Stochastic, and Williams %R.
 """
 
-import copy
 import json
 
 from langchain_core.messages import ToolMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from graph_util import BUNDLE_KEYS, bundle_lookup, compute_indicator_bundle
 
-def create_indicator_agent(llm, toolkit):
+
+def create_indicator_bundle_node():
+    """
+    Graph entry node: computes every indicator tool's output once from the
+    kline data and stores it in the state, so tool calls become lookups.
+    """
+
+    def indicator_bundle_node(state):
+        return compute_indicator_bundle(state["kline_data"])
+
+    return indicator_bundle_node
+
+
+def create_indicator_agent(llm, toolkit, inline_indicators=False):
     """
     Create an indicator analysis agent node for HFT. The agent uses LLM and indicator tools to analyze OHLCV data.
+    With inline_indicators the precomputed bundle goes straight into the
+    prompt and the tool-call round trip is skipped.
     """
 
     def indicator_agent_node(state):
+        bundle = {key: state.get(key) for key in BUNDLE_KEYS}
+        if any(value is None for value in bundle.values()):
+            bundle = compute_indicator_bundle(state["kline_data"])
+
+        def run_tool(call, tools):
+            """Tool result from the bundle; only non-default periods are computed."""
+            result = bundle_lookup(bundle, call["name"], call["args"])
+            if result is None:
+                tool_fn = next(t for t in tools if t.name == call["name"])
+                result = tool_fn.invoke({**call["args"], "kline_data": state["kline_data"]})
+            return ToolMessage(tool_call_id=call["id"], content=json.dumps(result))
+
+        time_frame = state["time_frame"]
+        messages = state.get("messages", [])
+        if not messages:
+            messages = [HumanMessage(content="Begin indicator analysis.")]
+
+        if inline_indicators:
+            prompt = ChatPromptTemplate.from_messages(
+                [
+                    (
+                        "system",
+                        "You are a high-frequency trading (HFT) analyst assistant operating under time-sensitive conditions. "
+                        "You must analyze technical indicators to support fast-paced trading execution.\n\n"
+                        f"⚠️ The OHLC data provided is from a {time_frame} intervals, reflecting recent market behavior. "
+                        "You must interpret this data quickly and accurately.\n\n"
+                        "Here is the OHLC data:\n{kline_data}.\n\n"
+                        "RSI(14), MACD(12,26,9), Stochastic(14,3,3), ROC(10) and Williams %R(14) "
+                        "are already computed (oldest first):\n{indicators}\n\n"
+                        "Analyze these results.\n",
+                    ),
+                    MessagesPlaceholder(variable_name="messages"),
+                ]
+            ).partial(kline_data=json.dumps(state["kline_data"], indent=2),
+                      indicators=json.dumps(bundle))
+            final_response = (prompt | llm).invoke(messages)
+            messages.append(final_response)
+            return {
+                "messages": messages,
+                "indicator_report": final_response.content or "Indicator analysis completed.",
+            }
+
         # --- Tool definitions ---
         tools = [
             toolkit.compute_macd,
@@ -24,7 +81,6 @@ def create_indicator_agent(llm, toolkit):
             toolkit.compute_stoch,
             toolkit.compute_willr,
         ]
-        time_frame = state["time_frame"]
         # --- System prompt for LLM ---
         prompt = ChatPromptTemplate.from_messages(
             [
@@ -44,10 +100,6 @@ def create_indicator_agent(llm, toolkit):
         ).partial(kline_data=json.dumps(state["kline_data"], indent=2))
 
         chain = prompt | llm.bind_tools(tools)
-        # messages = state["messages"]
-        messages = state.get("messages", [])
-        if not messages:
-            messages = [HumanMessage(content="Begin indicator analysis.")]
 
 
         # --- Step 1: Ask for tool calls ---
@@ -57,19 +109,7 @@ def create_indicator_agent(llm, toolkit):
         # --- Step 2: Collect tool results ---
         if hasattr(ai_response, "tool_calls") and ai_response.tool_calls:
             for call in ai_response.tool_calls:
-                tool_name = call["name"]
-                tool_args = call["args"]
-                # Always provide kline_data
-                tool_args["kline_data"] = copy.deepcopy(state["kline_data"])
-                # Lookup tool by name
-                tool_fn = next(t for t in tools if t.name == tool_name)
-                tool_result = tool_fn.invoke(tool_args)
-                # Append result as ToolMessage
-                messages.append(
-                    ToolMessage(
-                        tool_call_id=call["id"], content=json.dumps(tool_result)
-                    )
-                )
+                messages.append(run_tool(call, tools))
 
         # --- Step 3: Re-run the chain with tool results ---
         # Keep invoking until we get a text response (not another tool call)
@@ -89,16 +129,7 @@ def create_indicator_agent(llm, toolkit):
             
             # If there are more tool calls, execute them
             for call in final_response.tool_calls:
-                tool_name = call["name"]
-                tool_args = call["args"]
-                tool_args["kline_data"] = copy.deepcopy(state["kline_data"])
-                tool_fn = next(t for t in tools if t.name == tool_name)
-                tool_result = tool_fn.invoke(tool_args)
-                messages.append(
-                    ToolMessage(
-                        tool_call_id=call["id"], content=json.dumps(tool_result)
-                    )
-                )
+                messages.append(run_tool(call, tools))
 
         # Extract content - handle both string and empty content cases
         if final_response:
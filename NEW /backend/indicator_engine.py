@@ -0,0 +1,155 @@
+"""
+indicator_engine.py – Incremental indicator engine
+Keeps the state behind every chart indicator (rolling windows, EMA states,
+RSI's smoothed gains/losses) per series and advances it by one bar in O(1),
+instead of recomputing pandas_ta over the whole history.
+
+The per-indicator state objects and their semantics live in indicators.py;
+the engine's output matches its batch functions bar for bar.
+
+State is checkpointed per series (data/indicator_state/{symbol}/{interval}.json)
+together with the time of the last bar it has seen, so a restart only
+replays bars newer than that.
+"""
+
+import copy
+import json
+import os
+
+import pandas as pd
+
+from indicators import CHART_COLUMNS as COLUMNS
+from indicators import EMA, MACD, NAN, RSI, RollingWindow
+
+STATE_DIR = os.environ.get(
+    "INDICATOR_STATE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "indicator_state"),
+)
+
+
+class IndicatorEngine:
+    """
+    The chart's indicator set for one series, one bar at a time:
+    SMA20, EMA9, RSI14, MACD(12,26,9), BB(20,2).
+    """
+
+    def __init__(self, sma: int = 20, ema: int = 9, rsi: int = 14,
+                 macd=(12, 26, 9), bb: int = 20, bb_std: float = 2.0):
+        self.sma = RollingWindow(sma)
+        self.bb = self.sma if bb == sma else RollingWindow(bb)
+        self.bb_std = bb_std
+        self.ema = EMA(ema)
+        self.rsi = RSI(rsi)
+        self.macd = MACD(*macd)
+        self.last_time = None
+        self.bars = 0
+
+    def update(self, close: float, time=None) -> dict:
+        close = float(close)
+        self.sma.update(close)
+        if self.bb is not self.sma:
+            self.bb.update(close)
+        sma = self.sma.mean if self.sma.ready else NAN
+        if self.bb.ready:
+            mid, width = self.bb.mean, self.bb_std * self.bb.std(ddof=0)
+        else:
+            mid = width = NAN
+        macd, signal, hist = self.macd.update(close)
+        if time is not None:
+            self.last_time = pd.Timestamp(time)
+        self.bars += 1
+        return {
+            "SMA": sma, "EMA9": self.ema.update(close), "RSI": self.rsi.update(close),
+            "MACD": macd, "MACD_S": signal, "MACD_H": hist,
+            "BB_U": mid + width, "BB_L": mid - width, "BB_M": mid,
+        }
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Advance over the bars of `df` (time index, `close` column) that are newer
+        than the last bar seen; returns their indicator rows.
+        """
+        if self.last_time is not None and len(df):
+            df = df[df.index > _align(self.last_time, df.index)]
+        rows = [self.update(c, t) for t, c in zip(df.index, df["close"].to_numpy())]
+        return pd.DataFrame(rows, index=df.index, columns=COLUMNS)
+
+    def to_dict(self) -> dict:
+        d = {
+            "sma": self.sma.to_dict(), "ema": self.ema.to_dict(), "rsi": self.rsi.to_dict(),
+            "macd": self.macd.to_dict(), "bb_std": self.bb_std, "bars": self.bars,
+            "last_time": self.last_time.isoformat() if self.last_time is not None else None,
+        }
+        if self.bb is not self.sma:
+            d["bb"] = self.bb.to_dict()
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        e = cls.__new__(cls)
+        e.sma = RollingWindow.from_dict(d["sma"])
+        e.bb = RollingWindow.from_dict(d["bb"]) if "bb" in d else e.sma
+        e.bb_std = d["bb_std"]
+        e.ema = EMA.from_dict(d["ema"])
+        e.rsi = RSI.from_dict(d["rsi"])
+        e.macd = MACD.from_dict(d["macd"])
+        e.bars = d["bars"]
+        e.last_time = pd.Timestamp(d["last_time"]) if d["last_time"] else None
+        return e
+
+
+def _align(ts: pd.Timestamp, index: pd.DatetimeIndex) -> pd.Timestamp:
+    if index.tz is not None:
+        return ts.tz_localize(index.tz) if ts.tzinfo is None else ts.tz_convert(index.tz)
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+
+# ── Checkpoints ─────────────────────────────────────────────────────────────
+
+def checkpoint_path(symbol: str, interval: str, root: str = STATE_DIR) -> str:
+    return os.path.join(root, symbol, f"{interval}.json")
+
+
+def load_engine(symbol: str, interval: str, root: str = STATE_DIR) -> IndicatorEngine:
+    """The checkpointed engine for a series, or a fresh one."""
+    path = checkpoint_path(symbol, interval, root)
+    if not os.path.exists(path):
+        return IndicatorEngine()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return IndicatorEngine.from_dict(json.load(f))
+    except Exception as e:
+        print(f"[WARNING] Ignoring unreadable indicator state {path}: {e}")
+        return IndicatorEngine()
+
+
+def save_engine(symbol: str, interval: str, engine: IndicatorEngine, root: str = STATE_DIR):
+    path = checkpoint_path(symbol, interval, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(engine.to_dict(), f)
+    os.replace(tmp, path)
+
+
+def update_series(symbol: str, interval: str, df: pd.DataFrame, closed_before=None,
+                  root: str = STATE_DIR) -> pd.DataFrame:
+    """
+    Indicator rows for the bars of `df` the checkpoint has not seen yet.
+    Bars opening before `closed_before` are final and committed to the
+    checkpoint; later (still forming) bars are evaluated on a copy, so the next
+    call sees them again with their final values.
+    """
+    engine = load_engine(symbol, interval, root)
+    if closed_before is None:
+        closed, forming = df, df.iloc[:0]
+    else:
+        cut = _align(pd.Timestamp(closed_before), df.index)
+        closed, forming = df[df.index < cut], df[df.index >= cut]
+
+    out = engine.run(closed)
+    if len(out):
+        save_engine(symbol, interval, engine, root)
+    if len(forming):
+        out = pd.concat([out, copy.deepcopy(engine).run(forming)])
+    return out
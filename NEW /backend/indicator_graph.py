@@ -0,0 +1,194 @@
+"""
+indicator_graph.py – Field-selective, parameterized chart indicators
+Resolves the chart fields a client asks for (`fields=close,SMA`) with their
+indicator parameters (`params=rsi:7,ema:21`) into a graph of computation
+nodes and evaluates only the nodes those fields need.
+
+A node is a hashable tuple (op, *args); args that are tuples are input nodes:
+
+    ("col", "close")
+    ("ema", ("col", "close"), 12)
+    ("ema", ("sub", ("ema", close, 12), ("ema", close, 26)), 9)     MACD_S
+
+Fields that share work share nodes (MACD_H reuses MACD and MACD_S, BB_M is
+SMA20 with default params), and each node is computed once per evaluation –
+or once per series version when a memo (e.g. the bar cache) is passed in.
+"""
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+RAW_FIELDS = ["time", "open", "high", "low", "close", "volume"]
+ALL_FIELDS = RAW_FIELDS + indicators.CHART_COLUMNS
+
+# Indicator family -> parameter names and defaults, in `params=` order
+FAMILIES = {
+    "sma":  {"length": 20},
+    "ema":  {"length": 9},
+    "rsi":  {"length": 14},
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+    "bb":   {"length": 20, "std": 2.0},
+}
+FIELD_FAMILY = {
+    "SMA": "sma", "EMA9": "ema", "RSI": "rsi",
+    "MACD": "macd", "MACD_S": "macd", "MACD_H": "macd",
+    "BB_U": "bb", "BB_L": "bb", "BB_M": "bb",
+}
+
+_OPS = {
+    "sma":   indicators.sma,
+    "stdev": indicators.stdev,
+    "ema":   indicators.ema,
+    "rsi":   indicators.rsi,
+    "sub":   np.subtract,
+    "band":  lambda mid, sd, k: mid + k * sd,
+}
+
+
+# ── Request parsing ─────────────────────────────────────────────────────────
+
+def parse_fields(text: str = None) -> list:
+    """`fields=` as a list in canonical column order; all fields if empty."""
+    if not text:
+        return list(ALL_FIELDS)
+    wanted = {f.strip() for f in text.split(",") if f.strip()}
+    unknown = wanted - set(ALL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} (valid: {', '.join(ALL_FIELDS)})")
+    return [f for f in ALL_FIELDS if f == "time" or f in wanted]
+
+
+def parse_params(text: str = None) -> dict:
+    """
+    `params=rsi:7,ema:21,macd:8/21/5,bb:20/2.5` -> full parameter dict per
+    family. Values map to FAMILIES' parameter order; omitted ones keep
+    their defaults.
+    """
+    params = default_params()
+    for item in (text or "").split(","):
+        if not item.strip():
+            continue
+        family, _, values = item.partition(":")
+        family = family.strip().lower()
+        if family not in FAMILIES:
+            raise ValueError(f"Unknown indicator '{family}' (valid: {', '.join(FAMILIES)})")
+        names = list(FAMILIES[family])
+        values = [v for v in values.split("/") if v.strip()]
+        if not values or len(values) > len(names):
+            raise ValueError(f"'{item}' needs 1-{len(names)} values: {'/'.join(names)}")
+        for name, raw in zip(names, values):
+            params[family][name] = _parse_value(family, name, raw)
+    return params
+
+
+def default_params() -> dict:
+    return {family: dict(defaults) for family, defaults in FAMILIES.items()}
+
+
+def _parse_value(family: str, name: str, raw: str):
+    try:
+        value = float(raw) if name == "std" else int(raw)
+    except ValueError:
+        raise ValueError(f"{family}.{name} must be a number, got '{raw}'") from None
+    if value <= 0 or (name != "std" and value > 1000):
+        raise ValueError(f"{family}.{name} out of range: {raw}")
+    return value
+
+
+def is_default(params: dict, family: str) -> bool:
+    return params[family] == FAMILIES[family]
+
+
+# ── Graph ───────────────────────────────────────────────────────────────────
+
+def field_node(field: str, params: dict) -> tuple:
+    """The node that computes `field` with the given family parameters."""
+    close = ("col", "close")
+    if field not in FIELD_FAMILY:
+        return ("col", field)
+    p = params[FIELD_FAMILY[field]]
+    if field == "SMA":
+        return ("sma", close, p["length"])
+    if field == "EMA9":
+        return ("ema", close, p["length"])
+    if field == "RSI":
+        return ("rsi", close, p["length"])
+
+    if FIELD_FAMILY[field] == "macd":
+        line = ("sub", ("ema", close, p["fast"]), ("ema", close, p["slow"]))
+        signal = ("ema", line, p["signal"])
+        return {"MACD": line, "MACD_S": signal, "MACD_H": ("sub", line, signal)}[field]
+
+    mid = ("sma", close, p["length"])
+    sd = ("stdev", close, p["length"])
+    return {"BB_M": mid, "BB_U": ("band", mid, sd, p["std"]), "BB_L": ("band", mid, sd, -p["std"])}[field]
+
+
+def dependencies(node: tuple) -> list:
+    return [a for a in node[1:] if isinstance(a, tuple)]
+
+
+def evaluate(node: tuple, df: pd.DataFrame, memo=None, _seen=None):
+    """
+    Values of `node` over `df`. `memo(node, fn)` may return a stored result
+    instead of calling fn(); nodes are evaluated once per call regardless.
+    """
+    seen = {} if _seen is None else _seen
+    if node in seen:
+        return seen[node]
+
+    def compute():
+        if node[0] == "col":
+            return df[node[1]].to_numpy(dtype=np.float64)
+        args = [evaluate(a, df, memo, seen) if isinstance(a, tuple) else a for a in node[1:]]
+        return _OPS[node[0]](*args)
+
+    seen[node] = value = memo(node, compute) if memo is not None and node[0] != "col" else compute()
+    return value
+
+
+def select(df: pd.DataFrame, fields: list, params: dict, memo=None, source=None) -> pd.DataFrame:
+    """
+    `df` (a finalized chart frame) reduced to `fields`. Indicators with default
+    parameters are taken from the frame as computed at load time; the rest are
+    evaluated from the graph, sharing nodes between fields. With `source`, the
+    OHLCV `df` was cut from (indexed by bar time), those nodes are evaluated
+    over it and aligned to df's `time` rows, so their warm-up is not cut short
+    by the rows finalize_ohlcv dropped.
+    """
+    rows = None if source is None else source.index.astype(str).get_indexer(df["time"].astype(str))
+    seen = {}
+    out = {}
+    for field in fields:
+        family = FIELD_FAMILY.get(field)
+        if field in df.columns and (family is None or is_default(params, family)):
+            out[field] = df[field]
+        elif rows is None:
+            out[field] = evaluate(field_node(field, params), df, memo, seen)
+        else:
+            values = evaluate(field_node(field, params), source, memo, seen)
+            out[field] = np.where(rows >= 0, values[rows], np.nan)
+    return pd.DataFrame(out, index=df.index)
+
+
+def compute(df: pd.DataFrame, fields: list) -> pd.DataFrame:
+    """Copy of an OHLCV frame with the default-parameter `fields` it lacks added."""
+    missing = [f for f in fields if f not in df.columns]
+    if not missing:
+        return df
+    return df.join(select(df, missing, default_params()))
+
+
+def used_params(fields: list, params: dict) -> dict:
+    """The parameter sets that apply to the requested fields."""
+    families = {FIELD_FAMILY[f] for f in fields if f in FIELD_FAMILY}
+    return {family: params[family] for family in FAMILIES if family in families}
+
+
+def series_version(df: pd.DataFrame) -> tuple:
+    """Identifies the contents of a chart frame: row count and its last bar."""
+    if df.empty:
+        return (0,)
+    return (len(df), str(df["time"].iloc[-1]), float(df["close"].iloc[-1]))
@@ -0,0 +1,346 @@
+"""
+market_data.py – Pluggable market data providers
+Every provider returns the same canonical OHLCV frame:
+
+    index   DatetimeIndex named "time", tz-aware Asia/Kolkata, sorted, unique
+    columns open, high, low, close, volume – all float64
+
+Providers:
+    YFinanceProvider   yf.download, grouped multi-ticker batches
+    FyersProvider      fyers.history (NSE:SYMBOL-EQ, epoch-second candles)
+    RecordingProvider  wraps any provider and captures its responses to disk
+    ReplayProvider     serves captured responses offline and deterministically
+
+get_provider() picks one from MARKET_DATA_PROVIDER (yfinance | fyers | replay);
+MARKET_DATA_RECORD=1 wraps it in a RecordingProvider.
+"""
+
+import os
+import threading
+
+import pandas as pd
+
+from market_hours import IST
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+INTERVAL_PERIOD_MAP = {
+    "1m": "7d",
+    "2m": "7d",
+    "5m": "60d",
+    "15m": "60d",
+    "30m": "60d",
+    "1h": "730d",
+    "1d": "2y",
+}
+
+REPLAY_DIR = os.environ.get(
+    "MARKET_DATA_REPLAY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "replay"),
+)
+
+
+def period_to_timedelta(period: str) -> pd.Timedelta:
+    if period.endswith("y"):
+        return pd.Timedelta(days=365 * int(period[:-1]))
+    return pd.Timedelta(period)
+
+
+# Longest range one history call accepts (FYERS: 100 days for minute
+# resolutions, 366 for daily bars); longer ranges are split into chunks
+MAX_CHUNK_DAYS = {"1d": 366}
+DEFAULT_MAX_CHUNK_DAYS = 100
+
+
+def _day(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize(IST) if ts.tzinfo is None else ts.tz_convert(IST)
+    return ts.normalize()
+
+
+def plan_chunks(start, end, interval: str):
+    """Inclusive (first_day, last_day) ranges no longer than the API cap."""
+    span = pd.Timedelta(days=MAX_CHUNK_DAYS.get(interval, DEFAULT_MAX_CHUNK_DAYS))
+    first, last = _day(start), _day(end)
+    chunks = []
+    while first <= last:
+        chunk_end = min(first + span - pd.Timedelta(days=1), last)
+        chunks.append((first, chunk_end))
+        first = chunk_end + pd.Timedelta(days=1)
+    return chunks
+
+
+def empty_ohlcv() -> pd.DataFrame:
+    index = pd.DatetimeIndex([], tz=IST, name="time")
+    return pd.DataFrame({c: pd.Series(dtype="float64") for c in OHLCV_COLUMNS}, index=index)
+
+
+def to_canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize any provider's raw frame to the canonical OHLCV layout."""
+    if df is None or df.empty:
+        return empty_ohlcv()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df = df.rename(columns=lambda c: str(c).lower())
+    df = df[OHLCV_COLUMNS].astype("float64").dropna()
+
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is None:
+        # Daily bars come back as naive session dates
+        index = index.tz_localize(IST)
+    df.index = index.tz_convert(IST)
+    df.index.name = "time"
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+class ProviderError(RuntimeError):
+    """The provider answered with an error (rate limit, auth, server) rather than data."""
+
+
+class MarketDataProvider:
+    """Base class: history() is required, history_batch() defaults to a loop."""
+
+    name = "base"
+
+    def now(self) -> pd.Timestamp:
+        """The provider's notion of the current time; period windows end here."""
+        return pd.Timestamp.now(tz=IST)
+
+    def history(self, symbol: str, interval: str = "5m", start=None, end=None,
+                period: str = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def history_batch(self, symbols, interval: str = "5m", start=None, end=None,
+                      period: str = None) -> dict:
+        frames = {}
+        for symbol in symbols:
+            try:
+                df = self.history(symbol, interval, start=start, end=end, period=period)
+            except ProviderError as e:
+                print(f"[WARNING] {self.name} history failed for {symbol}: {e}")
+                continue
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+
+class YFinanceProvider(MarketDataProvider):
+
+    name = "yfinance"
+
+    def _download(self, tickers, interval, start, end, period, **kwargs):
+        import yfinance as yf
+
+        if start is None:
+            kwargs["period"] = period or INTERVAL_PERIOD_MAP.get(interval, "120d")
+        else:
+            kwargs["start"] = start
+        if end is not None:
+            kwargs["end"] = end
+        return yf.download(tickers, interval=interval, progress=False, **kwargs)
+
+    def history(self, symbol, interval="5m", start=None, end=None, period=None):
+        import yfinance as yf
+
+        df = to_canonical(self._download(symbol, interval, start, end, period))
+        # yf.download logs failures (rate limits, bad tickers) and returns an empty frame
+        error = getattr(getattr(yf, "shared", None), "_ERRORS", {}).get(symbol.upper())
+        if df.empty and error:
+            raise ProviderError(f"yfinance history failed for {symbol} {interval}: {error}")
+        return df
+
+    def history_batch(self, symbols, interval="5m", start=None, end=None, period=None):
+        """One grouped request; the (ticker, field) frame is split by column slices."""
+        symbols = list(symbols)
+        raw = self._download(symbols, interval, start, end, period,
+                             group_by="ticker", threads=True)
+        if raw.empty:
+            return {}
+        if not isinstance(raw.columns, pd.MultiIndex):
+            return {symbols[0]: to_canonical(raw)}
+
+        frames = {}
+        for symbol in raw.columns.get_level_values(0).unique():
+            df = to_canonical(raw[symbol].copy())
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+
+class FyersProvider(MarketDataProvider):
+
+    name = "fyers"
+
+    RESOLUTIONS = {
+        "1m": "1", "2m": "2", "5m": "5", "15m": "15", "30m": "30",
+        "60m": "60", "1h": "60", "1d": "D",
+    }
+    # Expired / invalid access token
+    AUTH_ERROR_CODES = {-8, -15, -16, -17}
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        # Process-wide pooled client; the token is refreshed behind it
+        from fyers_auth import get_fyers_client
+        return get_fyers_client()
+
+    @staticmethod
+    def to_fyers_symbol(symbol: str) -> str:
+        """HDFCBANK.NS -> NSE:HDFCBANK-EQ (already-qualified symbols pass through)."""
+        if ":" in symbol:
+            return symbol
+        return f"NSE:{symbol.split('.')[0].upper()}-EQ"
+
+    def history(self, symbol, interval="5m", start=None, end=None, period=None):
+        end = pd.Timestamp.now(tz=IST) if end is None else pd.Timestamp(end)
+        if start is None:
+            start = end - period_to_timedelta(period or INTERVAL_PERIOD_MAP.get(interval, "120d"))
+        start = pd.Timestamp(start)
+        # e.g. 730 days of 1h bars: one request per chunk the API accepts
+        frames = [self._history_chunk(symbol, interval, first, last)
+                  for first, last in plan_chunks(start, end, interval)]
+        df = to_canonical(pd.concat(frames)) if frames else empty_ohlcv()
+        return df[df.index >= _as_ist(start)]
+
+    def _history_chunk(self, symbol, interval, first, last):
+        request = {
+            "symbol": self.to_fyers_symbol(symbol),
+            "resolution": self.RESOLUTIONS.get(interval, interval),
+            "date_format": "1",
+            "range_from": first.strftime("%Y-%m-%d"),
+            "range_to": last.strftime("%Y-%m-%d"),
+            "cont_flag": "1",
+        }
+        client = self.client
+        response = client.history(request)
+        if self._client is None and response.get("code") in self.AUTH_ERROR_CODES:
+            from fyers_auth import invalidate_token
+            invalidate_token(client.token)
+            response = self.client.history(request)
+        if response.get("s") not in ("ok", "no_data"):
+            # Raised, not returned empty, so callers retry instead of taking it as "no bars"
+            raise ProviderError(f"FYERS history failed for {symbol} {interval}: {response}")
+        if not response.get("candles"):
+            return empty_ohlcv()
+
+        df = pd.DataFrame(response["candles"], columns=["time"] + OHLCV_COLUMNS)
+        df["time"] = pd.to_datetime(df["time"], unit="s", utc=True)
+        return to_canonical(df.set_index("time"))
+
+
+def _capture_path(root: str, provider: str, symbol: str, interval: str) -> str:
+    return os.path.join(root, provider, symbol, f"{interval}.parquet")
+
+
+class RecordingProvider(MarketDataProvider):
+    """Pass-through that merges every response into a per-series capture file."""
+
+    def __init__(self, inner: MarketDataProvider, root: str = REPLAY_DIR):
+        self.inner = inner
+        self.root = root
+        self.name = inner.name
+        self._lock = threading.Lock()
+
+    def _record(self, symbol, interval, df):
+        if df.empty:
+            return
+        path = _capture_path(self.root, self.name, symbol, interval)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                df = to_canonical(pd.concat([pd.read_parquet(path), df]))
+            df.to_parquet(path)
+
+    def now(self):
+        return self.inner.now()
+
+    def history(self, symbol, interval="5m", start=None, end=None, period=None):
+        df = self.inner.history(symbol, interval, start=start, end=end, period=period)
+        self._record(symbol, interval, df)
+        return df
+
+    def history_batch(self, symbols, interval="5m", start=None, end=None, period=None):
+        frames = self.inner.history_batch(symbols, interval, start=start, end=end, period=period)
+        for symbol, df in frames.items():
+            self._record(symbol, interval, df)
+        return frames
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves captured series without any network access. Period requests are
+    measured back from the last captured bar rather than the wall clock, so
+    the same request always returns the same frame.
+    """
+
+    name = "replay"
+
+    def __init__(self, root: str = REPLAY_DIR, source: str = "yfinance", now=None):
+        self.root = root
+        self.source = source
+        self._frames = {}
+        self._now = pd.Timestamp(now) if now is not None else None
+
+    def now(self):
+        """End of the capture: the newest bar across all recorded series."""
+        if self._now is None:
+            latest = []
+            source_dir = os.path.join(self.root, self.source)
+            for dirpath, _, files in os.walk(source_dir):
+                for name in files:
+                    if name.endswith(".parquet"):
+                        index = pd.read_parquet(os.path.join(dirpath, name), columns=[]).index
+                        if len(index):
+                            latest.append(_as_ist(index.max()))
+            self._now = max(latest) if latest else pd.Timestamp.now(tz=IST)
+        return _as_ist(self._now)
+
+    def _series(self, symbol, interval):
+        key = (symbol, interval)
+        if key not in self._frames:
+            path = _capture_path(self.root, self.source, symbol, interval)
+            self._frames[key] = (
+                to_canonical(pd.read_parquet(path)) if os.path.exists(path) else empty_ohlcv()
+            )
+        return self._frames[key]
+
+    def history(self, symbol, interval="5m", start=None, end=None, period=None):
+        df = self._series(symbol, interval)
+        if df.empty:
+            return df
+        if end is not None:
+            df = df[df.index <= _as_ist(end)]
+        if start is not None:
+            df = df[df.index >= _as_ist(start)]
+        elif not df.empty:
+            window = period_to_timedelta(period or INTERVAL_PERIOD_MAP.get(interval, "120d"))
+            df = df[df.index >= df.index[-1] - window]
+        return df.copy()
+
+
+def _as_ist(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize(IST) if ts.tzinfo is None else ts.tz_convert(IST)
+
+
+def get_provider(name: str = None) -> MarketDataProvider:
+    name = (name or os.environ.get("MARKET_DATA_PROVIDER", "yfinance")).lower()
+    if name == "yfinance":
+        provider = YFinanceProvider()
+    elif name == "fyers":
+        provider = FyersProvider()
+    elif name == "replay":
+        return ReplayProvider(source=os.environ.get("MARKET_DATA_REPLAY_SOURCE", "yfinance"),
+                              now=os.environ.get("MARKET_DATA_REPLAY_NOW"))
+    else:
+        raise ValueError(f"Unknown market data provider: '{name}'. Use yfinance/fyers/replay.")
+
+    if os.environ.get("MARKET_DATA_RECORD") == "1":
+        provider = RecordingProvider(provider)
+    return provider
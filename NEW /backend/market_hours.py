@@ -0,0 +1,168 @@
+"""
+market_hours.py – NSE session calendar and bar boundaries
+Intraday bars are anchored at the 09:15 IST session open, so a 1h bar covers
+09:15–10:15, 10:15–11:15, ... and the last bar of the day is cut at 15:30.
+"""
+
+import os
+import threading
+from datetime import time
+
+import pandas as pd
+
+IST = "Asia/Kolkata"
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+
+INTERVAL_MINUTES = {
+    "1m": 1,
+    "2m": 2,
+    "5m": 5,
+    "15m": 15,
+    "30m": 30,
+    "60m": 60,
+    "1h": 60,
+    "90m": 90,
+}
+
+# NSE equity trading holidays (weekends are handled separately).
+# Add the next year's list here, or pass extra dates via NSE_HOLIDAYS=YYYY-MM-DD,...
+NSE_HOLIDAYS = {
+    "2023-01-26", "2023-03-07", "2023-03-30", "2023-04-04", "2023-04-07",
+    "2023-04-14", "2023-05-01", "2023-06-29", "2023-08-15", "2023-09-19",
+    "2023-10-02", "2023-10-24", "2023-11-14", "2023-11-27", "2023-12-25",
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29",
+    "2024-04-11", "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17",
+    "2024-07-17", "2024-08-15", "2024-10-02", "2024-11-01", "2024-11-15",
+    "2024-11-20", "2024-12-25",
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14",
+    "2025-04-18", "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02",
+    "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31",
+    "2026-04-03", "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26",
+    "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24",
+    "2026-12-25",
+}
+NSE_HOLIDAYS.update(d.strip() for d in os.environ.get("NSE_HOLIDAYS", "").split(",") if d.strip())
+
+# Years the list above covers; other years are looked up in exchange_calendars
+# (XBOM shares NSE's equity holidays) if installed, else weekends only, with a warning
+_covered_years = {d[:4] for d in NSE_HOLIDAYS}
+_years_lock = threading.Lock()
+
+
+def _holidays_from_calendar(year: int) -> set:
+    import exchange_calendars
+    cal = exchange_calendars.get_calendar("XBOM", start=f"{year}-01-01", end=f"{year}-12-31")
+    days = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="B")
+    return {d.strftime("%Y-%m-%d") for d in days if not cal.is_session(d)}
+
+
+def _ensure_year(year: int):
+    key = str(year)
+    if key in _covered_years:
+        return
+    with _years_lock:
+        if key in _covered_years:
+            return
+        try:
+            NSE_HOLIDAYS.update(_holidays_from_calendar(year))
+            print(f"[INFO] NSE holidays for {year} loaded from exchange_calendars")
+        except Exception as e:
+            print(f"[WARNING] No NSE holiday list for {year} ({e}); treating every weekday as a "
+                  f"trading day. Add the year to market_hours.NSE_HOLIDAYS or set NSE_HOLIDAYS.")
+        _covered_years.add(key)
+
+
+def now_ist() -> pd.Timestamp:
+    return pd.Timestamp.now(tz=IST)
+
+
+def ensure_years(years):
+    """Make sure NSE_HOLIDAYS covers `years` (for vectorized calendar checks)."""
+    for year in set(int(y) for y in years):
+        _ensure_year(year)
+
+
+def is_trading_day(day: pd.Timestamp) -> bool:
+    _ensure_year(day.year)
+    return day.weekday() < 5 and day.strftime("%Y-%m-%d") not in NSE_HOLIDAYS
+
+
+def _session_bounds(day: pd.Timestamp):
+    day = day.normalize()
+    open_ = day + pd.Timedelta(hours=SESSION_OPEN.hour, minutes=SESSION_OPEN.minute)
+    close = day + pd.Timedelta(hours=SESSION_CLOSE.hour, minutes=SESSION_CLOSE.minute)
+    return open_, close
+
+
+def _trading_day(day: pd.Timestamp, step: int) -> pd.Timestamp:
+    """Nearest trading day at or after (step=1) / before (step=-1) `day`."""
+    day = day.normalize()
+    while not is_trading_day(day):
+        day += pd.Timedelta(days=step)
+    return day
+
+
+def is_market_open(now: pd.Timestamp = None) -> bool:
+    now = now_ist() if now is None else now.tz_convert(IST)
+    if not is_trading_day(now):
+        return False
+    open_, close = _session_bounds(now)
+    return open_ <= now < close
+
+
+def current_or_last_session(now: pd.Timestamp = None):
+    """(open, close) of the session in progress, or of the last completed one."""
+    now = now_ist() if now is None else now.tz_convert(IST)
+    open_, close = _session_bounds(now)
+    if is_trading_day(now) and now >= open_:
+        return open_, close
+    return _session_bounds(_trading_day(now - pd.Timedelta(days=1), -1))
+
+
+def next_session_open(now: pd.Timestamp = None) -> pd.Timestamp:
+    """Open of the next session that has not started yet."""
+    now = now_ist() if now is None else now.tz_convert(IST)
+    open_, _ = _session_bounds(now)
+    if is_trading_day(now) and now < open_:
+        return open_
+    return _session_bounds(_trading_day(now + pd.Timedelta(days=1), 1))[0]
+
+
+def bar_open(interval: str, now: pd.Timestamp = None) -> pd.Timestamp:
+    """
+    Open time of the bar that is forming at `now` (or the last bar of the
+    last session when the market is closed). Two calls return the same value
+    for as long as no new bar has closed, which makes it a cache/dedup key.
+    """
+    now = now_ist() if now is None else now.tz_convert(IST)
+    open_, close = current_or_last_session(now)
+    minutes = INTERVAL_MINUTES.get(interval)
+    if minutes is None:
+        return open_.normalize()
+
+    now = min(now, close - pd.Timedelta(microseconds=1))
+    elapsed = int((now - open_) // pd.Timedelta(minutes=minutes))
+    return open_ + pd.Timedelta(minutes=minutes * elapsed)
+
+
+def next_bar_close(interval: str, now: pd.Timestamp = None) -> pd.Timestamp:
+    """
+    When the data for `interval` next changes: the close of the forming bar
+    during a session, otherwise the close of the first bar of the next session.
+    Daily and longer bars change at the session close.
+    """
+    now = now_ist() if now is None else now.tz_convert(IST)
+    minutes = INTERVAL_MINUTES.get(interval)
+
+    if is_market_open(now):
+        _, close = _session_bounds(now)
+        if minutes is None:
+            return close
+        return min(bar_open(interval, now) + pd.Timedelta(minutes=minutes), close)
+
+    open_ = next_session_open(now)
+    if minutes is None:
+        return _session_bounds(open_)[1]
+    return open_ + pd.Timedelta(minutes=minutes)
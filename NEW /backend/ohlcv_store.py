@@ -0,0 +1,246 @@
+"""
+ohlcv_store.py – Local OHLCV store
+Parquet files partitioned by symbol / interval / day, with a per-series
+high-water mark so fetch_ohlcv only downloads bars newer than what is stored.
+
+Layout:
+    data/ohlcv/symbol=HDFCBANK.NS/interval=5m/date=2024-06-03.parquet
+    data/ohlcv/symbol=HDFCBANK.NS/interval=5m/_meta.json   {"hwm": "...", "bars": N, "rows": {day: n}}
+    data/ohlcv/symbol=HDFCBANK.NS/interval=5m/_quality.json  ingest quality report
+"""
+
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+STORE_DIR = os.environ.get(
+    "OHLCV_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ohlcv"),
+)
+
+# Daily/weekly bars would otherwise mean one file per bar — group them by year
+_YEARLY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _series_lock(symbol: str, interval: str) -> threading.Lock:
+    key = (symbol, interval)
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        return _locks[key]
+
+
+def _series_dir(symbol: str, interval: str) -> str:
+    return os.path.join(STORE_DIR, f"symbol={symbol}", f"interval={interval}")
+
+
+def _partition_keys(index: pd.DatetimeIndex, interval: str) -> pd.Index:
+    if interval in _YEARLY_INTERVALS:
+        return index.strftime("%Y")
+    return index.strftime("%Y-%m-%d")
+
+
+def _read_meta(symbol: str, interval: str) -> dict:
+    path = os.path.join(_series_dir(symbol, interval), "_meta.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_atomic(path: str, write_fn):
+    tmp = path + ".tmp"
+    write_fn(tmp)
+    os.replace(tmp, path)
+
+
+def _row_counts(series_dir: str, meta: dict) -> dict:
+    """Rows per stored partition, from the metadata or (for older metadata) the file footers."""
+    rows = dict(meta.get("rows", {}))
+    for name in os.listdir(series_dir):
+        if name.startswith("date=") and name.endswith(".parquet"):
+            key = name[len("date="):-len(".parquet")]
+            if key not in rows:
+                rows[key] = pq.read_metadata(os.path.join(series_dir, name)).num_rows
+    return rows
+
+
+def high_water_mark(symbol: str, interval: str):
+    """Timestamp of the newest stored bar, or None if nothing is stored yet."""
+    hwm = _read_meta(symbol, interval).get("hwm")
+    return pd.Timestamp(hwm) if hwm else None
+
+
+def append_bars(symbol: str, interval: str, df: pd.DataFrame) -> int:
+    """
+    Merge new bars into their day partitions and advance the high-water mark.
+    Bars that already exist are overwritten, so re-fetching the still-forming
+    last candle simply replaces it. Returns the number of bars written.
+    """
+    if df is None or df.empty:
+        return 0
+
+    series_dir = _series_dir(symbol, interval)
+    with _series_lock(symbol, interval):
+        os.makedirs(series_dir, exist_ok=True)
+        meta = _read_meta(symbol, interval)
+        rows = _row_counts(series_dir, meta)
+
+        for key, part in df.groupby(_partition_keys(df.index, interval)):
+            path = os.path.join(series_dir, f"date={key}.parquet")
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path), part])
+                part = part[~part.index.duplicated(keep="last")]
+            part = part.sort_index()
+            _write_atomic(path, lambda p: part.to_parquet(p))
+            rows[key] = len(part)
+
+        hwm = df.index.max()
+        if meta.get("hwm"):
+            hwm = max(hwm, pd.Timestamp(meta["hwm"]))
+        meta["hwm"] = hwm.isoformat()
+        meta["rows"] = rows
+        meta["bars"] = sum(rows.values())    # distinct stored bars; re-fetched ones replace, not add
+        meta_path = os.path.join(series_dir, "_meta.json")
+
+        def _dump(p):
+            with open(p, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        _write_atomic(meta_path, _dump)
+    return len(df)
+
+
+def read_series(symbol: str, interval: str, start=None) -> pd.DataFrame:
+    """
+    Read stored bars for one series, optionally only from `start` onwards.
+    Partitions older than `start` are skipped without being opened.
+    """
+    series_dir = _series_dir(symbol, interval)
+    if not os.path.isdir(series_dir):
+        return pd.DataFrame()
+
+    min_key = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        min_key = _partition_keys(pd.DatetimeIndex([start]), interval)[0]
+
+    files = []
+    for name in sorted(os.listdir(series_dir)):
+        if not (name.startswith("date=") and name.endswith(".parquet")):
+            continue
+        key = name[len("date="):-len(".parquet")]
+        if min_key is not None and key < min_key:
+            continue
+        files.append(os.path.join(series_dir, name))
+
+    if not files:
+        return pd.DataFrame()
+
+    with _series_lock(symbol, interval):
+        df = pd.concat([pd.read_parquet(f) for f in files])
+    df = df.sort_index()
+    if start is not None:
+        if df.index.tz is not None and start.tzinfo is None:
+            start = start.tz_localize(df.index.tz)
+        elif df.index.tz is None and start.tzinfo is not None:
+            start = start.tz_convert(None)
+        df = df[df.index >= start]
+    return df
+
+
+def tail_bars(symbol: str, interval: str, n: int) -> pd.DataFrame:
+    """The last `n` stored bars, reading only the newest partitions."""
+    series_dir = _series_dir(symbol, interval)
+    if n <= 0 or not os.path.isdir(series_dir):
+        return pd.DataFrame()
+    names = sorted((f for f in os.listdir(series_dir) if f.startswith("date=") and f.endswith(".parquet")),
+                   reverse=True)
+    parts, rows = [], 0
+    with _series_lock(symbol, interval):
+        for name in names:
+            part = pd.read_parquet(os.path.join(series_dir, name))
+            parts.append(part)
+            rows += len(part)
+            if rows >= n:
+                break
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts).sort_index().iloc[-n:]
+
+
+def drop_bars(symbol: str, interval: str, index: pd.DatetimeIndex) -> int:
+    """Remove stored bars at the given times (e.g. a tick later found to be bad)."""
+    series_dir = _series_dir(symbol, interval)
+    if not len(index) or not os.path.isdir(series_dir):
+        return 0
+    dropped = 0
+    with _series_lock(symbol, interval):
+        meta = _read_meta(symbol, interval)
+        rows = _row_counts(series_dir, meta)
+        for key, times in pd.Series(index, index=index).groupby(_partition_keys(index, interval)):
+            path = os.path.join(series_dir, f"date={key}.parquet")
+            if not os.path.exists(path):
+                continue
+            part = pd.read_parquet(path)
+            keep = ~part.index.isin(times.index)
+            if keep.all():
+                continue
+            dropped += int((~keep).sum())
+            part = part[keep]
+            _write_atomic(path, lambda p: part.to_parquet(p))
+            rows[key] = len(part)
+        if dropped:
+            meta["rows"] = rows
+            meta["bars"] = sum(rows.values())
+
+            def _dump(p):
+                with open(p, "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+
+            _write_atomic(os.path.join(series_dir, "_meta.json"), _dump)
+    return dropped
+
+
+def series_bytes(symbol: str, interval: str) -> int:
+    """On-disk size of one stored series."""
+    series_dir = _series_dir(symbol, interval)
+    if not os.path.isdir(series_dir):
+        return 0
+    return sum(os.path.getsize(os.path.join(series_dir, name)) for name in os.listdir(series_dir))
+
+
+def record_quality(symbol: str, interval: str, report: dict):
+    """Keep the latest ingest quality report and running totals for a series."""
+    series_dir = _series_dir(symbol, interval)
+    path = os.path.join(series_dir, "_quality.json")
+    with _series_lock(symbol, interval):
+        os.makedirs(series_dir, exist_ok=True)
+        quality = {"last": report, "totals": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                quality["totals"] = json.load(f).get("totals", {})
+        for key, value in report.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                quality["totals"][key] = quality["totals"].get(key, 0) + value
+        quality["last"]["at"] = pd.Timestamp.now(tz="UTC").isoformat()
+
+        def _dump(p):
+            with open(p, "w", encoding="utf-8") as f:
+                json.dump(quality, f)
+
+        _write_atomic(path, _dump)
+
+
+def read_quality(symbol: str, interval: str) -> dict:
+    path = os.path.join(_series_dir(symbol, interval), "_quality.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,92 @@
+"""
+panel.py – Universe-wide indicator computation on (time × symbol) arrays
+Holds every symbol's OHLCV as aligned 2D float arrays (rows = union of bar
+times, columns = symbols) and computes the chart indicators for the whole
+universe into arrays of the same shape, ready for cross-sectional use.
+
+Missing data is NaN and `mask` marks where a symbol has a bar. The union
+index leaves holes in a symbol's column wherever another symbol has a bar it
+lacks, so chart_indicators() hands each symbol's own bars to
+indicators.chart_indicators and scatters the results back: every symbol gets
+exactly what indicators.py computes on that symbol alone, and outputs are NaN
+wherever the symbol has no bar. The kernels are indicators.py's own (numba
+when that backend is active); this module does not define any.
+"""
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from indicators import CHART_COLUMNS
+from market_data import OHLCV_COLUMNS
+
+
+class Panel:
+    """Aligned OHLCV arrays for a universe: fields[name] has shape (len(index), len(symbols))."""
+
+    def __init__(self, index: pd.DatetimeIndex, symbols, fields: dict):
+        self.index = index
+        self.symbols = list(symbols)
+        self.fields = fields
+
+    @classmethod
+    def from_frames(cls, frames: dict):
+        """Align canonical per-symbol OHLCV frames on the union of their bar times."""
+        frames = {s: df for s, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            return cls(pd.DatetimeIndex([], name="time"), [], {c: np.empty((0, 0)) for c in OHLCV_COLUMNS})
+        symbols = list(frames)
+        wide = pd.concat({s: frames[s][OHLCV_COLUMNS] for s in symbols}, axis=1).sort_index()
+        fields = {
+            c: wide.xs(c, axis=1, level=1).reindex(columns=symbols).to_numpy(dtype=np.float64)
+            for c in OHLCV_COLUMNS
+        }
+        return cls(wide.index, symbols, fields)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.fields[field]
+
+    @property
+    def mask(self) -> np.ndarray:
+        return ~np.isnan(self.fields["close"])
+
+    def frame(self, symbol: str, extra: dict = None) -> pd.DataFrame:
+        """One symbol's rows (where it has bars) with OHLCV and any extra panel fields."""
+        j = self.symbols.index(symbol)
+        rows = self.mask[:, j]
+        data = {c: self.fields[c][rows, j] for c in OHLCV_COLUMNS}
+        for name, values in (extra or {}).items():
+            data[name] = values[rows, j]
+        return pd.DataFrame(data, index=self.index[rows])
+
+    def frames(self, extra: dict = None) -> dict:
+        return {s: self.frame(s, extra) for s in self.symbols}
+
+
+def chart_indicators(panel: Panel) -> dict:
+    """
+    CHART_COLUMNS for the whole universe, each a (time × symbol) array.
+    Each symbol's column is computed by indicators.chart_indicators on its
+    own bars only, so gaps on the union index cost none.
+    """
+    mask = panel.mask
+    out = {name: np.full(mask.shape, np.nan) for name in CHART_COLUMNS}
+    for j in range(len(panel.symbols)):
+        rows = mask[:, j]
+        for name, values in indicators.chart_indicators(panel["close"][rows, j]).items():
+            out[name][rows, j] = values
+    return out
+
+
+def latest(panel: Panel, values: dict) -> pd.DataFrame:
+    """Each symbol's last bar: close plus every indicator, one row per symbol."""
+    mask = panel.mask
+    if not mask.size:
+        return pd.DataFrame(columns=["time", "close"] + list(values))
+    last = len(mask) - 1 - np.argmax(mask[::-1], axis=0)
+    cols = np.arange(len(panel.symbols))
+    out = pd.DataFrame({"time": panel.index[last].astype(str), "close": panel["close"][last, cols]},
+                       index=pd.Index(panel.symbols, name="symbol"))
+    for name, arr in values.items():
+        out[name] = arr[last, cols]
+    return out[mask.any(axis=0)]
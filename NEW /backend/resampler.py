@@ -0,0 +1,74 @@
+"""
+resampler.py – Derive coarser OHLCV bars from one fine-grained base series
+Bins are anchored at the 09:15 IST session open (a 1h bar is 09:15–10:15,
+..., 15:15–15:30) and computed with a single vectorized groupby. Rollups are
+persisted in the OHLCV store and updated incrementally: only bins at or
+after the last stored one are recomputed when new base bars arrive.
+"""
+
+import pandas as pd
+
+import ohlcv_store
+from market_hours import INTERVAL_MINUTES, IST, SESSION_OPEN
+
+# target interval -> base interval it is derived from. 1m/5m are the only
+# series downloaded for these. Only intervals whose period window
+# (market_data.INTERVAL_PERIOD_MAP) the base covers are derived: 60m/1h keep
+# their 730 days of native history instead of the base's 60.
+RESAMPLE_BASE = {
+    "2m": "1m",
+    "15m": "5m",
+    "30m": "5m",
+}
+
+OHLCV_AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+_SESSION_OFFSET_NS = (SESSION_OPEN.hour * 60 + SESSION_OPEN.minute) * 60 * 10**9
+
+
+def bin_labels(index: pd.DatetimeIndex, interval: str) -> pd.DatetimeIndex:
+    """Open time of the session-anchored `interval` bin each timestamp falls in."""
+    width_ns = INTERVAL_MINUTES[interval] * 60 * 10**9
+    local = index.tz_convert(IST) if index.tz is not None else index.tz_localize(IST)
+    ns = local.tz_localize(None).as_unit("ns").asi8
+    anchor = (ns // (86400 * 10**9)) * (86400 * 10**9) + _SESSION_OFFSET_NS
+    labels = anchor + ((ns - anchor) // width_ns) * width_ns
+    out = pd.DatetimeIndex(labels.astype("datetime64[ns]")).tz_localize(IST)
+    return out if index.tz is not None else out.tz_localize(None)
+
+
+def resample_ohlcv(base: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Aggregate base bars into `interval` bars in one groupby pass."""
+    if base.empty:
+        return base
+    cols = {c: f for c, f in OHLCV_AGG.items() if c in base.columns}
+    out = base[list(cols)].groupby(bin_labels(base.index, interval)).agg(cols)
+    out.index.name = base.index.name
+    return out
+
+
+def update_rollup(symbol: str, interval: str, base: pd.DataFrame) -> int:
+    """
+    Bring the stored `interval` rollup up to date with the base series.
+    The last stored bin may have been partial, so it is rebuilt together with
+    everything after it. Returns the number of rollup bars written.
+    """
+    if base is None or base.empty:
+        return 0
+    hwm = ohlcv_store.high_water_mark(symbol, interval)
+    if hwm is not None:
+        base = base[base.index >= hwm]
+    else:
+        # A leading bin that starts before the base data would be partial
+        first = bin_labels(base.index[:1], interval)[0]
+        if first != base.index[0]:
+            base = base[bin_labels(base.index, interval) > first]
+    return ohlcv_store.append_bars(symbol, interval, resample_ohlcv(base, interval))
+
+
+def load_derived(symbol: str, interval: str, base: pd.DataFrame) -> pd.DataFrame:
+    """Rollup bars covering the same window as `base`, derived without any download."""
+    update_rollup(symbol, interval, base)
+    if base.empty:
+        return base
+    return ohlcv_store.read_series(symbol, interval, start=base.index[0])
@@ -0,0 +1,163 @@
+"""
+shm_store.py – Shared-memory candle + indicator store for API worker processes
+The collector is the single writer; every API worker maps the same files
+read-only, so memory stays O(universe) however many workers run.
+
+One file per (symbol, interval) under /dev/shm/chronos, fixed layout:
+
+    header  int64[16]               magic, version, generation, active slot,
+                                    rows in slot 0/1, capacity, n_cols, updated_ns
+    times   int64[2, capacity]      bar open, UTC epoch ns
+    values  float64[2, n_cols, capacity]   SHM_COLUMNS, column-major
+
+Two slots (double buffering): the writer fills the inactive slot, then flips
+`active` and bumps `generation` (odd while a write is in progress – a
+seqlock). Readers retry while the generation is odd or changed under them,
+and get numpy views straight into the mapping – no copies. A slot is only
+rewritten two publishes later, i.e. a bar after the reader got it.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from market_hours import IST
+
+SHM_DIR = os.environ.get(
+    "SHM_DIR",
+    "/dev/shm/chronos" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "chronos-shm"),
+)
+SHM_COLUMNS = ["open", "high", "low", "close", "volume",
+               "SMA", "EMA9", "RSI", "MACD", "MACD_S", "MACD_H", "BB_U", "BB_L", "BB_M"]
+DEFAULT_CAPACITY = 8192
+
+_MAGIC = 0x43_48_52_4F_4E_4F_53   # "CHRONOS"
+_VERSION = 1
+_HEADER_LEN = 16
+_GEN, _ACTIVE, _ROWS0, _ROWS1, _CAP, _NCOLS, _UPDATED = 2, 3, 4, 5, 6, 7, 8
+
+
+class _Mapping:
+    """numpy views over one mapped series file."""
+
+    def __init__(self, path: str, mode: str):
+        self.path = path
+        self.inode = os.stat(path).st_ino
+        raw = np.memmap(path, dtype=np.int64, mode=mode)
+        self.header = raw[:_HEADER_LEN]
+        cap, ncols = int(self.header[_CAP]), int(self.header[_NCOLS])
+        self.capacity, self.n_cols = cap, ncols
+        self.times = raw[_HEADER_LEN:_HEADER_LEN + 2 * cap].reshape(2, cap)
+        self.values = np.memmap(
+            path, dtype=np.float64, mode=mode,
+            offset=(_HEADER_LEN + 2 * cap) * 8, shape=(2, ncols, cap),
+        )
+
+
+def _path(symbol: str, interval: str) -> str:
+    return os.path.join(SHM_DIR, f"{symbol}__{interval}.bin")
+
+
+def _create(path: str, capacity: int, n_cols: int):
+    """Create a zeroed series file and swap it in atomically."""
+    os.makedirs(SHM_DIR, exist_ok=True)
+    size = (_HEADER_LEN + 2 * capacity + 2 * n_cols * capacity) * 8
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.truncate(size)
+    header = np.memmap(tmp, dtype=np.int64, mode="r+", shape=(_HEADER_LEN,))
+    header[0], header[1] = _MAGIC, _VERSION
+    header[_CAP], header[_NCOLS] = capacity, n_cols
+    header.flush()
+    del header
+    os.replace(tmp, path)
+
+
+# ── Writer (collector process) ──────────────────────────────────────────────
+
+_writers = {}
+
+
+def publish(symbol: str, interval: str, df: pd.DataFrame, capacity: int = DEFAULT_CAPACITY):
+    """Write the newest `capacity` bars of a finalized frame (with `time`)."""
+    path = _path(symbol, interval)
+    df = df.tail(capacity)
+    m = _writers.get(path)
+    if m is None or not os.path.exists(path) or m.capacity < len(df):
+        if not os.path.exists(path) or _Mapping(path, "r").capacity < len(df):
+            _create(path, max(capacity, len(df)), len(SHM_COLUMNS))
+        m = _writers[path] = _Mapping(path, "r+")
+
+    n = len(df)
+    times = pd.DatetimeIndex(pd.to_datetime(df["time"])).tz_convert("UTC").as_unit("ns").asi8
+    cols = np.column_stack([
+        df[c].to_numpy(dtype=np.float64, na_value=np.nan) if c in df.columns else np.full(n, np.nan)
+        for c in SHM_COLUMNS
+    ]).T
+
+    h = m.header
+    slot = 1 - int(h[_ACTIVE])
+    h[_GEN] += 1                      # odd: write in progress
+    m.times[slot, :n] = times
+    m.values[slot, :, :n] = cols
+    h[_ROWS0 + slot] = n
+    h[_ACTIVE] = slot
+    h[_UPDATED] = time.time_ns()
+    h[_GEN] += 1                      # even: consistent again
+
+
+# ── Readers (API workers) ───────────────────────────────────────────────────
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def _reader(path: str):
+    with _readers_lock:
+        m = _readers.get(path)
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            _readers.pop(path, None)
+            return None
+        if m is None or m.inode != inode:
+            m = _readers[path] = _Mapping(path, "r")
+        return m
+
+
+def read(symbol: str, interval: str, max_retries: int = 100):
+    """
+    Consistent snapshot of a series as a DataFrame whose numeric columns are
+    read-only views into shared memory, or None if nothing is published.
+    The frame carries `updated_at` (UTC) in df.attrs.
+    """
+    m = _reader(_path(symbol, interval))
+    if m is None:
+        return None
+
+    h = m.header
+    for _ in range(max_retries):
+        gen = int(h[_GEN])
+        if gen % 2:
+            time.sleep(0)
+            continue
+        slot = int(h[_ACTIVE])
+        n = int(h[_ROWS0 + slot])
+        updated = int(h[_UPDATED])
+        times = m.times[slot, :n]
+        values = m.values[slot, :, :n]
+        if int(h[_GEN]) == gen:
+            break
+    else:
+        return None
+    if n == 0:
+        return None
+
+    df = pd.DataFrame(values.T, columns=SHM_COLUMNS, copy=False)
+    df.insert(0, "time", pd.DatetimeIndex(times, tz="UTC").tz_convert(IST).astype(str))
+    df.attrs["updated_at"] = pd.Timestamp(updated, unit="ns", tz="UTC")
+    return df
@@ -0,0 +1,190 @@
+"""
+storage.py – Pluggable candle storage
+Every backend stores the same unit, a columnar day document (see
+firebase_store.encode_day), keyed by (symbol, interval, day):
+
+    get_day(symbol, interval, day)        document or None
+    put_days(symbol, interval, docs)      {day: document}; returns commits made
+    days(symbol, interval, start=None)    documents with day >= start, by day
+
+Backends:
+    FirestoreStorage     stocks/{symbol}/intervals/{interval}/candles/{day}
+    SQLiteStorage        one local file (data/candles.sqlite), same API
+    ReadThroughStorage   SQLite in front of Firestore: writes go to both,
+                         reads are served locally and only fall through to
+                         Firestore for days the local file has not seen yet
+
+get_storage() picks one from CANDLE_STORAGE (firestore | sqlite | cached).
+The default is "cached" when Firebase credentials are configured and
+"sqlite" otherwise, so the backend also runs offline.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+import firebase_config
+
+SQLITE_PATH = os.environ.get(
+    "CANDLE_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "candles.sqlite"),
+)
+MAX_BATCH_OPS = 500   # Firestore's limit per WriteBatch commit
+
+
+class CandleStorage:
+    """Base class for day-document stores."""
+
+    name = "base"
+
+    def get_day(self, symbol: str, interval: str, day: str):
+        raise NotImplementedError
+
+    def put_days(self, symbol: str, interval: str, docs: dict) -> int:
+        raise NotImplementedError
+
+    def days(self, symbol: str, interval: str, start: str = None) -> list:
+        raise NotImplementedError
+
+
+class FirestoreStorage(CandleStorage):
+
+    name = "firestore"
+
+    def __init__(self, db=None):
+        self._db = db
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = firebase_config.get_db()
+        return self._db
+
+    def _collection(self, symbol, interval):
+        return (self.db.collection("stocks").document(symbol)
+                  .collection("intervals").document(interval or "default")
+                  .collection("candles"))
+
+    def get_day(self, symbol, interval, day):
+        snap = self._collection(symbol, interval).document(day).get()
+        return snap.to_dict() if snap is not None and snap.exists else None
+
+    def put_days(self, symbol, interval, docs):
+        collection = self._collection(symbol, interval)
+        keys = sorted(docs)
+        for i in range(0, len(keys), MAX_BATCH_OPS):
+            batch = self.db.batch()
+            for day in keys[i:i + MAX_BATCH_OPS]:
+                batch.set(collection.document(day), docs[day])
+            batch.commit()
+        return -(-len(keys) // MAX_BATCH_OPS)
+
+    def days(self, symbol, interval, start=None):
+        query = self._collection(symbol, interval)
+        if start is not None:
+            query = query.where("day", ">=", start)
+        return sorted((snap.to_dict() for snap in query.stream()), key=lambda d: d["day"])
+
+
+class SQLiteStorage(CandleStorage):
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS candle_days ("
+                " symbol TEXT, interval TEXT, day TEXT, doc TEXT,"
+                " PRIMARY KEY (symbol, interval, day))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_day(self, symbol, interval, day):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc FROM candle_days WHERE symbol = ? AND interval = ? AND day = ?",
+                (symbol, interval or "default", day)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_days(self, symbol, interval, docs):
+        rows = [(symbol, interval or "default", day, json.dumps(doc)) for day, doc in docs.items()]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO candle_days VALUES (?, ?, ?, ?)", rows)
+        return 1 if rows else 0
+
+    def days(self, symbol, interval, start=None):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc FROM candle_days WHERE symbol = ? AND interval = ? AND day >= ? ORDER BY day",
+                (symbol, interval or "default", start or "")).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def get_meta(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+
+class ReadThroughStorage(CandleStorage):
+    """
+    Local SQLite cache in front of a remote store. The local file records,
+    per series, the earliest day from which it mirrors the remote; reads from
+    that day on never leave the machine. Writes go to the remote first, so
+    the cache never holds data the remote lacks.
+    """
+
+    name = "cached"
+
+    def __init__(self, local: SQLiteStorage, remote: CandleStorage):
+        self.local = local
+        self.remote = remote
+
+    @staticmethod
+    def _synced_key(symbol, interval):
+        return f"synced_from:{symbol}:{interval or 'default'}"
+
+    def get_day(self, symbol, interval, day):
+        doc = self.local.get_day(symbol, interval, day)
+        if doc is None:
+            doc = self.remote.get_day(symbol, interval, day)
+            if doc is not None:
+                self.local.put_days(symbol, interval, {day: doc})
+        return doc
+
+    def put_days(self, symbol, interval, docs):
+        commits = self.remote.put_days(symbol, interval, docs)
+        self.local.put_days(symbol, interval, docs)
+        return commits
+
+    def days(self, symbol, interval, start=None):
+        key = self._synced_key(symbol, interval)
+        synced = self.local.get_meta(key)           # "" = everything
+        wanted = start or ""
+        if synced is None or wanted < synced:
+            docs = self.remote.days(symbol, interval, start)
+            self.local.put_days(symbol, interval, {d["day"]: d for d in docs})
+            self.local.set_meta(key, wanted)
+        return self.local.days(symbol, interval, start)
+
+
+def get_storage(name: str = None) -> CandleStorage:
+    name = (name or os.environ.get("CANDLE_STORAGE")
+            or ("cached" if firebase_config.configured() else "sqlite")).lower()
+    if name == "firestore":
+        return FirestoreStorage()
+    if name == "sqlite":
+        return SQLiteStorage()
+    if name == "cached":
+        return ReadThroughStorage(SQLiteStorage(), FirestoreStorage())
+    raise ValueError(f"Unknown candle storage: '{name}'. Use firestore/sqlite/cached.")
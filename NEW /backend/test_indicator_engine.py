@@ -0,0 +1,150 @@
+"""
+Incremental indicator engine vs. batch implementations (indicators.py,
+pandas_ta, talib).
+
+    python -m pytest test_indicator_engine.py     (or run this file directly)
+
+The reference functions restate pandas_ta's own formulas in pandas; when
+pandas_ta / talib are installed the engine is compared with them as well,
+after the warm-up where their seeding may differ.
+"""
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicator_engine
+import indicators
+from indicator_engine import COLUMNS, IndicatorEngine
+
+WARMUP = 300
+
+
+def make_bars(n=3000, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 1500 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    if n > 520:
+        close[500:520] = close[499]   # flat stretch: zero gains and losses
+    index = pd.date_range("2025-01-06 09:15", periods=n, freq="5min", tz="Asia/Kolkata")
+    return pd.DataFrame({"close": close}, index=index)
+
+
+def ref_ema(s, length):
+    s = s.copy()
+    first = s.first_valid_index()
+    start = s.index.get_loc(first)
+    seeded = s.iloc[start:].copy()
+    seeded.iloc[length - 1] = seeded.iloc[:length].mean()
+    seeded.iloc[:length - 1] = np.nan
+    s.iloc[start:] = seeded
+    return s.ewm(span=length, adjust=False).mean()
+
+
+def ref_rsi(close, length=14):
+    diff = close.diff()
+    gain = diff.clip(lower=0).where(diff.notna())
+    loss = diff.clip(upper=0).where(diff.notna())
+    gain = gain.ewm(alpha=1 / length, min_periods=length).mean()
+    loss = loss.ewm(alpha=1 / length, min_periods=length).mean()
+    return 100 * gain / (gain + loss.abs())
+
+
+def reference(df):
+    close = df["close"]
+    macd = ref_ema(close, 12) - ref_ema(close, 26)
+    signal = ref_ema(macd, 9)
+    mid = close.rolling(20).mean()
+    # Exact windowed stdev: rolling().std() leaves ~1e-5 noise on flat stretches
+    std = pd.Series(np.nan, index=close.index)
+    std.iloc[19:] = np.lib.stride_tricks.sliding_window_view(close.to_numpy(), 20).std(axis=1)
+    return pd.DataFrame({
+        "SMA": mid, "EMA9": ref_ema(close, 9), "RSI": ref_rsi(close),
+        "MACD": macd, "MACD_S": signal, "MACD_H": macd - signal,
+        "BB_U": mid + 2 * std, "BB_L": mid - 2 * std, "BB_M": mid,
+    })[COLUMNS]
+
+
+def assert_close(actual, expected, rtol=1e-9, atol=1e-9):
+    for col in expected.columns:
+        np.testing.assert_allclose(actual[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=rtol, atol=atol, equal_nan=True, err_msg=col)
+
+
+def test_matches_reference_from_first_bar():
+    df = make_bars()
+    assert_close(IndicatorEngine().run(df), reference(df))
+
+
+def test_batch_library_matches_engine():
+    df = make_bars()
+    batch = pd.DataFrame(indicators.chart_indicators(df["close"]), index=df.index)
+    assert_close(IndicatorEngine().run(df), batch)
+
+
+def test_matches_pandas_ta_after_warmup():
+    ta = pytest.importorskip("pandas_ta")
+    df = make_bars()
+    close = df["close"]
+    macd = ta.macd(close)
+    bb = ta.bbands(close, length=20, std=2)
+    expected = pd.DataFrame({
+        "SMA": ta.sma(close, length=20), "EMA9": ta.ema(close, length=9), "RSI": ta.rsi(close, length=14),
+        "MACD": macd["MACD_12_26_9"], "MACD_S": macd["MACDs_12_26_9"], "MACD_H": macd["MACDh_12_26_9"],
+        "BB_U": bb[[c for c in bb.columns if c.startswith("BBU")][0]],
+        "BB_L": bb[[c for c in bb.columns if c.startswith("BBL")][0]],
+        "BB_M": bb[[c for c in bb.columns if c.startswith("BBM")][0]],
+    })
+    assert_close(IndicatorEngine().run(df).iloc[WARMUP:], expected.iloc[WARMUP:], rtol=1e-6, atol=1e-6)
+
+
+def test_matches_talib_after_warmup():
+    talib = pytest.importorskip("talib")
+    df = make_bars()
+    close = df["close"].to_numpy()
+    macd, signal, hist = talib.MACD(close, 12, 26, 9)
+    upper, mid, lower = talib.BBANDS(close, 20, 2, 2)
+    expected = pd.DataFrame({
+        "SMA": talib.SMA(close, 20), "EMA9": talib.EMA(close, 9), "RSI": talib.RSI(close, 14),
+        "MACD": macd, "MACD_S": signal, "MACD_H": hist, "BB_U": upper, "BB_L": lower, "BB_M": mid,
+    }, index=df.index)
+    assert_close(IndicatorEngine().run(df).iloc[WARMUP:], expected.iloc[WARMUP:], rtol=1e-6, atol=1e-6)
+
+
+def test_checkpoint_resume_matches_single_pass():
+    df = make_bars()
+    full = IndicatorEngine().run(df)
+    with tempfile.TemporaryDirectory() as root:
+        first = indicator_engine.update_series("TEST.NS", "5m", df.iloc[:1700], root=root)
+        # Overlapping input: bars the checkpoint has already seen are skipped
+        second = indicator_engine.update_series("TEST.NS", "5m", df.iloc[1500:], root=root)
+    assert len(first) + len(second) == len(df)
+    assert_close(pd.concat([first, second]), full, rtol=0, atol=0)
+
+
+def test_forming_bar_is_not_committed():
+    df = make_bars(200)
+    revised = df.copy()
+    revised.iloc[-1, 0] *= 1.01
+    with tempfile.TemporaryDirectory() as root:
+        provisional = indicator_engine.update_series("TEST.NS", "5m", df, closed_before=df.index[-1], root=root)
+        final = indicator_engine.update_series("TEST.NS", "5m", revised, root=root)
+    assert len(provisional) == 200 and len(final) == 1
+    assert_close(final, reference(revised).iloc[-1:])
+
+
+def test_long_run_has_no_drift():
+    df = make_bars(50000, seed=3)
+    assert_close(IndicatorEngine().run(df).iloc[-500:], reference(df).iloc[-500:], rtol=1e-8, atol=1e-8)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            try:
+                fn()
+            except pytest.skip.Exception as e:
+                print(f"[SKIP] {name}: {e}")
+                continue
+            print(f"[OK] {name}")
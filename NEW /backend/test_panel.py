@@ -0,0 +1,63 @@
+"""
+Universe panel (panel.py) vs. indicators.py run on each symbol alone.
+
+    python -m pytest test_panel.py     (or run this file directly)
+
+Symbols are aligned on the union of their bar times, so a bar one symbol
+lacks is a hole in its column; the panel results must not depend on that.
+"""
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import panel
+from indicators import CHART_COLUMNS
+
+
+def make_ohlcv(index, seed):
+    rng = np.random.default_rng(seed)
+    close = 1500 * np.exp(np.cumsum(rng.normal(0, 0.002, len(index))))
+    return pd.DataFrame({"open": close, "high": close * 1.001, "low": close * 0.999,
+                         "close": close, "volume": 1000.0}, index=index.rename("time"))
+
+
+def per_symbol(frames):
+    return {s: indicators.add_indicators(df.copy()) for s, df in frames.items()}
+
+
+def assert_matches_per_symbol(frames):
+    universe = panel.Panel.from_frames(frames)
+    got = universe.frames(panel.chart_indicators(universe))
+    expected = per_symbol(frames)
+    for symbol, df in frames.items():
+        assert got[symbol].index.equals(df.index)
+        for col in CHART_COLUMNS:
+            np.testing.assert_allclose(got[symbol][col].to_numpy(), expected[symbol][col].to_numpy(),
+                                       rtol=1e-9, atol=1e-9, err_msg=f"{symbol} {col}")
+        # finalize_ohlcv keeps rows with SMA and RSI: the panel must not lose any
+        assert len(got[symbol].dropna(subset=["SMA", "RSI"])) == \
+            len(expected[symbol].dropna(subset=["SMA", "RSI"]))
+
+
+def test_missing_bar_matches_per_symbol():
+    index = pd.date_range("2025-01-06 09:15", periods=300, freq="5min", tz="Asia/Kolkata")
+    frames = {"A": make_ohlcv(index, 1), "B": make_ohlcv(index, 2).drop(index[150])}
+    assert_matches_per_symbol(frames)
+
+
+def test_ragged_starts_and_several_gaps_match_per_symbol():
+    index = pd.date_range("2025-01-06 09:15", periods=400, freq="5min", tz="Asia/Kolkata")
+    frames = {
+        "A": make_ohlcv(index, 3),
+        "B": make_ohlcv(index[60:], 4),
+        "C": make_ohlcv(index, 5).drop(index[[10, 11, 200, 399]]),
+    }
+    assert_matches_per_symbol(frames)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")
@@ -0,0 +1,90 @@
+"""
+Tick-to-bar aggregation (tick_stream.TickAggregator).
+
+    python -m pytest test_tick_stream.py     (or run this file directly)
+"""
+
+import numpy as np
+import pandas as pd
+
+from market_data import OHLCV_COLUMNS
+from tick_stream import TickAggregator, synthesize_ticks
+
+IST = "Asia/Kolkata"
+
+
+def make_bars(n=30, seed=11):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2025-01-06 09:15", periods=n, freq="5min", tz=IST, name="time")
+    close = 1000 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({"open": open_, "high": np.maximum(open_, close) + 0.5,
+                         "low": np.minimum(open_, close) - 0.5, "close": close,
+                         "volume": rng.integers(100, 1000, n).astype(float) * 7}, index=index)
+
+
+def epoch(ts: str) -> int:
+    return int(pd.Timestamp(ts, tz=IST).timestamp())
+
+
+def test_ticks_rebuild_the_bars():
+    bars = make_bars()
+    agg = TickAggregator("5m")
+    for tick in synthesize_ticks(bars, "TCS.NS"):
+        agg.on_message(tick)
+    agg.flush(float("inf"))
+    got = agg.frame("TCS.NS")
+    assert got.index.equals(bars.index)
+    np.testing.assert_allclose(got[OHLCV_COLUMNS].to_numpy(), bars[OHLCV_COLUMNS].to_numpy())
+
+
+def test_flush_closes_only_finished_bars():
+    agg = TickAggregator("5m")
+    agg.on_tick("A.NS", 100.0, epoch("2025-01-06 09:16"), qty=1)
+    agg.on_tick("B.NS", 200.0, epoch("2025-01-06 09:21"), qty=1)
+    agg.flush(epoch("2025-01-06 09:20"))
+    assert len(agg.frame("A.NS")) == 1 and len(agg.frame("B.NS")) == 0
+    assert len(agg.frame("B.NS", include_live=True)) == 1
+    agg.flush(epoch("2025-01-06 09:25"))
+    assert len(agg.frame("B.NS")) == 1 and agg.stats["bars"] == 2
+
+
+def test_late_ticks_are_dropped():
+    agg = TickAggregator("5m")
+    agg.on_tick("A.NS", 100.0, epoch("2025-01-06 09:16"), qty=1)
+    agg.on_tick("A.NS", 101.0, epoch("2025-01-06 09:21"), qty=1)
+    agg.on_tick("A.NS", 99.0, epoch("2025-01-06 09:17"), qty=1)       # bar already closed
+    agg.flush(epoch("2025-01-06 09:30"))
+    agg.on_tick("A.NS", 98.0, epoch("2025-01-06 09:24"), qty=1)       # after the flush
+    frame = agg.frame("A.NS", include_live=True)
+    assert list(frame["close"]) == [100.0, 101.0]
+    assert not frame.index.duplicated().any()
+    assert agg.stats["late"] == 2
+
+
+def test_listeners_run_outside_the_lock_in_close_order():
+    agg = TickAggregator("5m")
+    seen = []
+
+    def listener(symbol, bar):
+        assert not agg._lock.locked()
+        seen.append((symbol, bar["time"], bar["close"]))
+        agg.frame(symbol)             # would deadlock if called under the lock
+
+    def failing(symbol, bar):
+        raise RuntimeError("listener errors are logged, not raised")
+
+    agg.add_listener(listener)
+    agg.add_listener(failing)
+    for minute, price in [(16, 100.0), (21, 101.0), (26, 102.0)]:
+        agg.on_tick("A.NS", price, epoch(f"2025-01-06 09:{minute}"), qty=1)
+    agg.flush(float("inf"))
+    assert [s[2] for s in seen] == [100.0, 101.0, 102.0]
+    assert seen[0][1] == pd.Timestamp("2025-01-06 09:15", tz=IST)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")
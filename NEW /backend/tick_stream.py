@@ -0,0 +1,457 @@
+"""
+tick_stream.py – Streaming live-bar ingestion
+Consumes tick messages in the FYERS data-socket shape (SymbolUpdate:
+{"symbol": "NSE:TCS-EQ", "ltp": ..., "vol_traded_today": ...,
+"exch_feed_time": <epoch s>, ...}), aggregates them into 09:15-anchored OHLCV
+bars and keeps the closed bars of every symbol in a preallocated ring buffer.
+Each closed bar is handed to the registered bar-close listeners right away,
+instead of waiting for the next 5-minute poll.
+
+Sources:
+    connect_fyers()   live FYERS data socket (fyers_apiv3)
+    serve_replay()    local server streaming a recorded tick file (JSON lines)
+                      at any speed; stream_ticks() / consume() read it
+
+    python tick_stream.py synth TCS.NS --out ticks.jsonl     ticks from stored bars
+    python tick_stream.py serve ticks.jsonl --speed 60       replay server
+    python tick_stream.py consume --store                    bars into the store
+    python tick_stream.py live TCS.NS,INFY.NS --record ticks.jsonl
+    python tick_stream.py bench                              aggregation throughput
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from market_data import OHLCV_COLUMNS, FyersProvider
+from market_hours import INTERVAL_MINUTES, IST, SESSION_CLOSE, SESSION_OPEN
+
+DEFAULT_CAPACITY = 2048          # closed bars kept per symbol
+REPLAY_HOST = "127.0.0.1"
+REPLAY_PORT = 8765
+
+_IST_OFFSET = 19800              # seconds; IST has no DST
+_OPEN_SEC = SESSION_OPEN.hour * 3600 + SESSION_OPEN.minute * 60
+_CLOSE_SEC = SESSION_CLOSE.hour * 3600 + SESSION_CLOSE.minute * 60
+
+
+def from_fyers_symbol(symbol: str) -> str:
+    """NSE:HDFCBANK-EQ -> HDFCBANK.NS (other symbols pass through)."""
+    if symbol.startswith("NSE:") and symbol.endswith("-EQ"):
+        return f"{symbol[4:-3]}.NS"
+    return symbol
+
+
+class BarRing:
+    """Fixed-capacity ring of closed bars; the oldest bar is overwritten."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)          # bar open, epoch s
+        self.values = np.zeros((len(OHLCV_COLUMNS), capacity))
+        self.count = 0
+        self._next = 0
+
+    def append(self, start: int, o: float, h: float, l: float, c: float, v: float):
+        i = self._next
+        self.times[i] = start
+        self.values[:, i] = (o, h, l, c, v)
+        self._next = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Closed bars, oldest first, as a canonical OHLCV frame."""
+        order = (np.arange(self.count) + self._next - self.count) % self.capacity
+        index = pd.to_datetime(self.times[order], unit="s", utc=True).tz_convert(IST)
+        df = pd.DataFrame(self.values[:, order].T, columns=OHLCV_COLUMNS, index=index)
+        df.index.name = "time"
+        return df
+
+
+class _LiveBar:
+    __slots__ = ("start", "open", "high", "low", "close", "volume")
+
+    def __init__(self, start, price):
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0.0
+
+
+class TickAggregator:
+    """
+    Builds `interval` bars from ticks for any number of symbols. A bar closes
+    when the first tick of a later bar arrives, or on flush() once its end
+    has passed; ticks for a bar that already closed are counted as late and
+    dropped. Thread-safe: the FYERS socket delivers from its own thread.
+    Listeners run after the aggregation lock is released (a slow one, e.g. a
+    store write, does not hold up other ticks), in bar-close order.
+    """
+
+    def __init__(self, interval: str = "5m", capacity: int = DEFAULT_CAPACITY):
+        if interval not in INTERVAL_MINUTES:
+            raise ValueError(f"Streaming bars need an intraday interval, got {interval}")
+        self.interval = interval
+        self.width = INTERVAL_MINUTES[interval] * 60
+        self.capacity = capacity
+        self.rings = {}
+        self.stats = {"ticks": 0, "bars": 0, "outside_session": 0, "late": 0}
+        self._live = {}
+        self._last_closed = {}       # symbol -> start of its last closed bar
+        self._cum_volume = {}
+        self._listeners = []
+        self._closed = deque()       # (symbol, event) waiting for the listeners
+        self._lock = threading.Lock()
+        self._dispatch_lock = threading.Lock()
+
+    def add_listener(self, fn):
+        """fn(symbol, bar) for every closed bar; bar has time/open/.../volume/latency."""
+        self._listeners.append(fn)
+
+    def on_message(self, message):
+        """Feed one data-socket message (or a list of them); non-tick messages are ignored."""
+        if isinstance(message, list):
+            for m in message:
+                self.on_message(m)
+            return
+        if not isinstance(message, dict) or "ltp" not in message or "symbol" not in message:
+            return
+        ts = message.get("exch_feed_time") or message.get("last_traded_time") or time.time()
+        self.on_tick(from_fyers_symbol(message["symbol"]), float(message["ltp"]), int(ts),
+                     cum_volume=message.get("vol_traded_today"),
+                     qty=message.get("last_traded_qty"))
+
+    def on_tick(self, symbol: str, price: float, ts: int, cum_volume=None, qty=None):
+        second_of_day = (ts + _IST_OFFSET) % 86400
+        with self._lock:
+            self.stats["ticks"] += 1
+            if not _OPEN_SEC <= second_of_day < _CLOSE_SEC:
+                self.stats["outside_session"] += 1
+                return
+            start = ts - (second_of_day - _OPEN_SEC) % self.width
+
+            # vol_traded_today is cumulative; it restarts every session
+            volume = float(qty or 0)
+            if cum_volume is not None:
+                last = self._cum_volume.get(symbol)
+                volume = float(cum_volume - last) if last is not None and cum_volume >= last else 0.0
+                self._cum_volume[symbol] = cum_volume
+
+            bar = self._live.get(symbol)
+            # Older than the forming bar, or (after a flush) than the last closed one
+            newest = bar.start if bar is not None else self._last_closed.get(symbol)
+            if newest is not None and (start < newest or (bar is None and start == newest)):
+                self.stats["late"] += 1
+                return
+            if bar is None or start > bar.start:
+                if bar is not None:
+                    self._close(symbol, bar)
+                bar = self._live[symbol] = _LiveBar(start, price)
+            else:
+                bar.high = max(bar.high, price)
+                bar.low = min(bar.low, price)
+                bar.close = price
+            bar.volume += volume
+        self._dispatch()
+
+    def flush(self, now: float = None):
+        """Close every live bar whose end is at or before `now` (epoch s, default wall clock)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for symbol, bar in list(self._live.items()):
+                if bar.start + self.width <= now:
+                    self._close(symbol, bar)
+                    del self._live[symbol]
+        self._dispatch()
+
+    def _close(self, symbol: str, bar: _LiveBar):
+        """Move a bar into the ring and queue its event (caller holds the lock)."""
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = BarRing(self.capacity)
+        ring.append(bar.start, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        self._last_closed[symbol] = bar.start
+        self.stats["bars"] += 1
+        if not self._listeners:
+            return
+        self._closed.append((symbol, {
+            "time": pd.Timestamp(bar.start, unit="s", tz="UTC").tz_convert(IST),
+            "open": bar.open, "high": bar.high, "low": bar.low,
+            "close": bar.close, "volume": bar.volume,
+            "latency": time.time() - (bar.start + self.width),
+        }))
+
+    def _dispatch(self):
+        """Hand queued bar-close events to the listeners, outside the aggregation lock."""
+        if not self._closed:
+            return
+        with self._dispatch_lock:
+            while self._closed:
+                symbol, event = self._closed.popleft()
+                for fn in self._listeners:
+                    try:
+                        fn(symbol, event)
+                    except Exception as e:
+                        print(f"[WARNING] bar-close listener failed for {symbol}: {e}")
+
+    def frame(self, symbol: str, include_live: bool = False) -> pd.DataFrame:
+        """Closed bars for a symbol (plus the forming bar if asked) as canonical OHLCV."""
+        with self._lock:
+            ring = self.rings.get(symbol)
+            df = ring.to_frame() if ring is not None else BarRing(1).to_frame()
+            bar = self._live.get(symbol)
+            if include_live and bar is not None:
+                live = pd.DataFrame(
+                    [[bar.open, bar.high, bar.low, bar.close, bar.volume]], columns=OHLCV_COLUMNS,
+                    index=pd.DatetimeIndex([pd.Timestamp(bar.start, unit="s", tz="UTC").tz_convert(IST)],
+                                           name="time"))
+                df = pd.concat([df, live])
+        return df
+
+
+# ── Recording and synthetic ticks ───────────────────────────────────────────
+
+class TickRecorder:
+    """Appends every message to a JSON-lines file; use as a socket on_message hook."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, message):
+        with self._lock:
+            self._f.write(json.dumps(message) + "\n")
+
+    def close(self):
+        self._f.close()
+
+
+def synthesize_ticks(df: pd.DataFrame, symbol: str, ticks_per_bar: int = 8) -> list:
+    """
+    Data-socket messages that re-create stored bars: each bar walks
+    open -> high -> low -> close (or low first on down bars) with its volume
+    spread evenly, so replaying them through a TickAggregator yields the bars.
+    """
+    n, k = len(df), max(ticks_per_bar, 4)
+    starts = df.index.tz_convert("UTC").as_unit("s").asi8
+    width = int((df.index[1] - df.index[0]).total_seconds()) if n > 1 else 300
+    o, h, l, c = (df[col].to_numpy() for col in ("open", "high", "low", "close"))
+
+    up = (c >= o)[:, None]
+    path = np.empty((n, k))
+    path[:, 0], path[:, -1] = o, c
+    path[:, 1] = np.where(up[:, 0], l, h)
+    path[:, 2] = np.where(up[:, 0], h, l)
+    path[:, 3:-1] = c[:, None]
+    stamps = starts[:, None] + (np.arange(k) * (width - 1) // (k - 1))[None, :]
+
+    # Cumulative volume restarts each session, like vol_traded_today
+    day = df.index.normalize()
+    cum = df["volume"].groupby(day).cumsum().to_numpy()
+    per_tick = df["volume"].to_numpy() / (k - 1)
+    cum_path = (cum - df["volume"].to_numpy())[:, None] + per_tick[:, None] * np.arange(k)[None, :]
+
+    fyers_symbol = FyersProvider.to_fyers_symbol(symbol)
+    return [
+        {"type": "sf", "symbol": fyers_symbol, "ltp": float(p),
+         "vol_traded_today": int(v), "exch_feed_time": int(t)}
+        for p, v, t in zip(path.ravel(), cum_path.ravel(), stamps.ravel())
+    ]
+
+
+# ── Local replay server ─────────────────────────────────────────────────────
+
+def _load_ticks(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        ticks = [json.loads(line) for line in f if line.strip()]
+    return sorted(ticks, key=lambda m: m.get("exch_feed_time", 0))
+
+
+async def serve_replay(path: str, host: str = REPLAY_HOST, port: int = REPLAY_PORT,
+                       speed: float = 1.0):
+    """
+    Stream a recorded tick file to every client that connects, one JSON
+    message per line, paced by exch_feed_time / speed (speed <= 0: as fast
+    as possible). Returns the running asyncio server.
+    """
+    ticks = _load_ticks(path)
+
+    async def handle(reader, writer):
+        started, first = time.monotonic(), None
+        try:
+            for tick in ticks:
+                ts = tick.get("exch_feed_time", 0)
+                first = ts if first is None else first
+                if speed > 0:
+                    delay = (ts - first) / speed - (time.monotonic() - started)
+                    if delay > 0:
+                        await writer.drain()
+                        await asyncio.sleep(delay)
+                writer.write((json.dumps(tick) + "\n").encode())
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def stream_ticks(host: str = REPLAY_HOST, port: int = REPLAY_PORT):
+    """Async iterator over the messages of a replay server."""
+    reader, writer = await asyncio.open_connection(host, port, limit=2 ** 20)
+    try:
+        while line := await reader.readline():
+            yield json.loads(line)
+    finally:
+        writer.close()
+
+
+async def consume(aggregator: TickAggregator, host: str = REPLAY_HOST, port: int = REPLAY_PORT):
+    """Feed a replay stream into an aggregator; the last bars close when it ends."""
+    async for message in stream_ticks(host, port):
+        aggregator.on_message(message)
+    aggregator.flush(float("inf"))
+
+
+# ── Live FYERS data socket ──────────────────────────────────────────────────
+
+def connect_fyers(symbols, aggregator: TickAggregator, recorder: TickRecorder = None):
+    """Subscribe to SymbolUpdate ticks for `symbols` and feed them to the aggregator."""
+    from fyers_apiv3.FyersWebsocket import data_ws
+    import fyers_auth
+
+    def on_message(message):
+        if recorder is not None:
+            recorder(message)
+        aggregator.on_message(message)
+
+    def on_connect():
+        socket.subscribe(symbols=[FyersProvider.to_fyers_symbol(s) for s in symbols],
+                         data_type="SymbolUpdate")
+        socket.keep_running()
+
+    socket = data_ws.FyersDataSocket(
+        access_token=f"{os.getenv('FYERS_CLIENT_ID')}:{fyers_auth.get_access_token()}",
+        log_path="",
+        litemode=False,
+        write_to_file=False,
+        reconnect=True,
+        on_connect=on_connect,
+        on_message=on_message,
+        on_error=lambda e: print(f"FYERS data socket error: {e}"),
+    )
+    socket.connect()
+    return socket
+
+
+def store_bar(interval: str):
+    """Bar-close listener that ingests every closed bar into the local store."""
+    import data_quality
+
+    def listener(symbol, bar):
+        row = pd.DataFrame([{c: bar[c] for c in OHLCV_COLUMNS}],
+                           index=pd.DatetimeIndex([bar["time"]], name="time"))
+        data_quality.ingest(symbol, interval, row)
+    return listener
+
+
+def _print_bar(symbol, bar):
+    print(f"{bar['time']:%Y-%m-%d %H:%M} {symbol:14s} O {bar['open']:.2f} H {bar['high']:.2f} "
+          f"L {bar['low']:.2f} C {bar['close']:.2f} V {bar['volume']:.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Streaming tick ingestion.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("synth", help="write ticks re-creating stored bars")
+    p.add_argument("symbols")
+    p.add_argument("--interval", default="5m")
+    p.add_argument("--start", help="YYYY-MM-DD")
+    p.add_argument("--ticks-per-bar", type=int, default=8)
+    p.add_argument("--out", required=True)
+
+    p = sub.add_parser("serve", help="replay a recorded tick file")
+    p.add_argument("file")
+    p.add_argument("--speed", type=float, default=1.0, help="x real time, 0 = unthrottled")
+    p.add_argument("--port", type=int, default=REPLAY_PORT)
+
+    p = sub.add_parser("consume", help="aggregate a replay stream into bars")
+    p.add_argument("--interval", default="5m")
+    p.add_argument("--port", type=int, default=REPLAY_PORT)
+    p.add_argument("--store", action="store_true", help="ingest closed bars into the local store")
+
+    p = sub.add_parser("live", help="aggregate the FYERS data socket")
+    p.add_argument("symbols")
+    p.add_argument("--interval", default="5m")
+    p.add_argument("--record", help="also append raw ticks to this file")
+    p.add_argument("--store", action="store_true")
+
+    p = sub.add_parser("bench", help="aggregation throughput on synthetic ticks")
+    p.add_argument("--bars", type=int, default=20000)
+    p.add_argument("--ticks-per-bar", type=int, default=50)
+
+    args = parser.parse_args()
+
+    if args.command == "synth":
+        import ohlcv_store
+        ticks = []
+        for symbol in args.symbols.split(","):
+            df = ohlcv_store.read_series(symbol, args.interval, start=args.start)
+            ticks += synthesize_ticks(df, symbol, args.ticks_per_bar)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(t) + "\n" for t in sorted(ticks, key=lambda m: m["exch_feed_time"]))
+        print(f"Wrote {len(ticks)} ticks to {args.out}")
+
+    elif args.command == "serve":
+        async def _serve():
+            server = await serve_replay(args.file, port=args.port, speed=args.speed)
+            print(f"Replaying {args.file} at {args.speed}x on {REPLAY_HOST}:{args.port}")
+            async with server:
+                await server.serve_forever()
+        asyncio.run(_serve())
+
+    elif args.command == "consume":
+        agg = TickAggregator(args.interval)
+        agg.add_listener(_print_bar)
+        if args.store:
+            agg.add_listener(store_bar(args.interval))
+        started = time.perf_counter()
+        asyncio.run(consume(agg, port=args.port))
+        print(f"{agg.stats} in {time.perf_counter() - started:.1f}s")
+
+    elif args.command == "live":
+        agg = TickAggregator(args.interval)
+        agg.add_listener(_print_bar)
+        if args.store:
+            agg.add_listener(store_bar(args.interval))
+        recorder = TickRecorder(args.record) if args.record else None
+        connect_fyers(args.symbols.split(","), agg, recorder)
+        while True:
+            time.sleep(1)
+            agg.flush()
+
+    elif args.command == "bench":
+        index = pd.date_range("2025-01-06 09:15", periods=args.bars, freq="5min", tz=IST)
+        index = index[(index.hour * 60 + index.minute >= 555) & (index.hour * 60 + index.minute < 930)]
+        close = 1000 + np.cumsum(np.random.default_rng(0).normal(0, 1, len(index)))
+        df = pd.DataFrame({"open": close, "high": close + 1, "low": close - 1,
+                           "close": close, "volume": 1000.0}, index=index)
+        ticks = synthesize_ticks(df, "BENCH.NS", args.ticks_per_bar)
+        agg = TickAggregator("5m")
+        started = time.perf_counter()
+        for t in ticks:
+            agg.on_message(t)
+        agg.flush(float("inf"))
+        elapsed = time.perf_counter() - started
+        print(f"{len(ticks)} ticks -> {agg.stats['bars']} bars in {elapsed:.2f}s "
+              f"({len(ticks) / elapsed:,.0f} ticks/sec, {elapsed / len(ticks) * 1e6:.1f} us/tick)")
@@ -65,6 +65,7 @@ class TradingGraph:
             self.agent_llm,
             self.graph_llm,
             self.toolkit,
+            inline_indicators=self.config.get("inline_indicators", False),
         )
         self.graph = self.graph_setup.set_graph()
 
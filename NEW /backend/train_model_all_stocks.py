@@ -1,52 +1,43 @@
-import yfinance as yf
+import sys
 import pandas as pd
-import pandas_ta as ta
 import xgboost as xgb
 import joblib
 
+import ohlcv_store
+import panel
 from stocks_list import STOCKS
 
-print("Downloading data for training...")
+# Training reads the local store only. Fill it first, e.g.:
+#   python backfill.py --interval 15m --start 2023-01-01
+INTERVAL = "15m"
+SINCE = sys.argv[1] if len(sys.argv) > 1 else None   # optional YYYY-MM-DD lower bound
 
-all_data = []
+print("Loading data for training from the local store...")
+
+raw = {}
 
 for stock in STOCKS:
 
-    print("Fetching:", stock)
+    print("Loading:", stock)
 
-    df = yf.download(stock, period="60d", interval="15m")
+    df = ohlcv_store.read_series(stock, INTERVAL, start=SINCE)
 
     if df.empty:
-        print("Skipping", stock)
+        print("Skipping", stock, "(not in local store - run backfill.py)")
         continue
 
-    # Fix multi-index columns
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
+    raw[stock] = df
 
-    df.columns = [c.lower() for c in df.columns]
+# Indicators for the whole universe in one panel pass (same values the chart
+# and predict_price see)
+universe = panel.Panel.from_frames(raw)
+frames = universe.frames(panel.chart_indicators(universe))
 
-    # Indicators
-    df["SMA"] = ta.sma(df["close"], length=20)
-    df["EMA9"] = ta.ema(df["close"], length=9)
-    df["RSI"] = ta.rsi(df["close"], length=14)
-    
-    macd = ta.macd(df["close"])
-    if macd is not None:
-        df["MACD"] = macd.iloc[:,0]
-
-    # Bollinger Bands (safe detection)
-    bb = ta.bbands(df["close"], length=20)
-    if bb is not None:
-        upper = [c for c in bb.columns if "BBU" in c]
-        lower = [c for c in bb.columns if "BBL" in c]
+all_data = []
 
-        if upper:
-            df["BB_U"] = bb[upper[0]]
-        if lower:
-            df["BB_L"] = bb[lower[0]]
+for stock, df in frames.items():
 
-    df.dropna(inplace=True)
+    df = df.dropna()
 
     if df.empty:
         print("Skipping after indicators:", stock)
@@ -56,7 +47,7 @@ for stock in STOCKS:
 
 # Safety check
 if len(all_data) == 0:
-    raise ValueError("No stock data downloaded")
+    raise ValueError("No stock data in the local store")
 
 print("Combining datasets...")
 
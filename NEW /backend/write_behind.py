@@ -0,0 +1,113 @@
+"""
+write_behind.py – Write-behind persistence queue
+Takes storage writes off the request path: callers submit() and return at
+once, and a background thread drains the queue into the storage backend.
+
+    coalescing   one pending write per key (e.g. a series); a newer submit
+                 replaces the queued arguments instead of adding a second write
+    bounded      at most `maxsize` pending keys; when full the oldest pending
+                 write is dropped ("drop_oldest"), or the caller waits up to
+                 `block_timeout` seconds for room first ("block")
+    shutdown     close() (registered with atexit) drains what is queued
+    metrics      depth, coalesced / dropped / written / failed counts, and lag
+                 (seconds from first submit of a write to its completion)
+"""
+
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+
+class WriteBehindQueue:
+
+    def __init__(self, write_fn, maxsize: int = 256, policy: str = "drop_oldest",
+                 block_timeout: float = 1.0, name: str = "write-behind"):
+        if policy not in ("drop_oldest", "block"):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.write_fn = write_fn
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.name = name
+        self._pending = OrderedDict()     # key -> (args, kwargs, first submitted at)
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._metrics = {"submitted": 0, "coalesced": 0, "dropped": 0, "written": 0,
+                         "failed": 0, "max_depth": 0, "last_lag_s": 0.0, "max_lag_s": 0.0}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, key, *args, **kwargs) -> bool:
+        """Queue write_fn(*args, **kwargs) under `key`; False once the queue is closed."""
+        with self._cond:
+            if self._closed:
+                return False
+            m = self._metrics
+            m["submitted"] += 1
+            if key in self._pending:
+                first = self._pending[key][2]
+                self._pending[key] = (args, kwargs, first)
+                m["coalesced"] += 1
+                return True
+            if len(self._pending) >= self.maxsize and self.policy == "block":
+                self._cond.wait_for(lambda: len(self._pending) < self.maxsize or self._closed,
+                                    timeout=self.block_timeout)
+            while len(self._pending) >= self.maxsize:
+                self._pending.popitem(last=False)
+                m["dropped"] += 1
+            self._pending[key] = (args, kwargs, time.monotonic())
+            m["max_depth"] = max(m["max_depth"], len(self._pending))
+            self._cond.notify_all()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return                  # closed and drained
+                key, (args, kwargs, first) = self._pending.popitem(last=False)
+                self._busy = True
+                self._cond.notify_all()     # room for blocked submitters
+            try:
+                self.write_fn(*args, **kwargs)
+                ok = True
+            except Exception as e:
+                print(f"[WARNING] {self.name}: write for {key} failed: {e}")
+                ok = False
+            with self._cond:
+                m = self._metrics
+                lag = time.monotonic() - first
+                m["written" if ok else "failed"] += 1
+                m["last_lag_s"] = lag
+                m["max_lag_s"] = max(m["max_lag_s"], lag)
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every queued write has been attempted; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout=timeout)
+
+    def close(self, timeout: float = 30.0):
+        """Stop accepting writes and drain the queue."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            m = dict(self._metrics)
+            m["depth"] = len(self._pending)
+            m["in_flight"] = self._busy
+            oldest = next(iter(self._pending.values()), None)
+            m["oldest_pending_s"] = time.monotonic() - oldest[2] if oldest else 0.0
+        for k in ("last_lag_s", "max_lag_s", "oldest_pending_s"):
+            m[k] = round(m[k], 3)
+        return m
@@ -1,21 +1,709 @@
-import pandas as pd
+"""
+indicators.py – Shared indicator library
+One definition of every indicator used by the chart endpoint, the agent tools,
+the quant agents and the ML features, so they all report the same numbers.
+
+Batch API: array-likes in, float64 NumPy arrays out, NaN during warm-up.
+Sweep API: one indicator over many lengths in one pass, (time × length) out.
+Streaming API: state objects advanced one bar at a time in O(1)
+(RollingWindow, EMA, RMA, RSI, MACD); indicator_engine builds on them.
+
+Semantics follow pandas_ta:
+    SMA    rolling mean
+    EMA    seeded with the SMA of the first `length` values, then recursive
+    RSI    gains/losses smoothed with rma = ewm(alpha=1/length, adjust=True)
+    MACD   EMA(fast) - EMA(slow); signal is the EMA of MACD from its first value
+    BB     SMA +- std * population stdev (ddof=0)
+    STOCH  %K = SMA(fast %K, 3), %D = SMA(%K, 3)   (talib defaults)
+talib seeds RSI and the fast MACD EMA differently; both agree after warm-up.
+
+The path-dependent loops (the EMA/RMA recursions behind EMA, MACD and RSI,
+the rolling extremes behind STOCH and WILLR) and the rolling windows run as
+Numba kernels when numba is installed, and fall back to pandas/NumPy
+otherwise; the backends agree to rounding. INDICATORS_BACKEND=numpy forces
+the fallback.
+
+This file is self-contained (NumPy + pandas, optionally numba). The backends
+are separate deployables, so each carries a byte-identical copy: edit this
+one (NEW /backend) and copy it to backend/, backend Manya/ and backend and
+ml/ml/. .gitattributes pins the copies to LF so they cannot drift apart.
+"""
+
+import math
+import os
+from collections import deque
+
 import numpy as np
+import pandas as pd
+
+CHART_COLUMNS = ["SMA", "EMA9", "RSI", "MACD", "MACD_S", "MACD_H", "BB_U", "BB_L", "BB_M"]
+
+NAN = float("nan")
+_RESYNC_EVERY = 1000   # updates between exact recomputes of a rolling window
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# ── Compiled kernels (optional) ─────────────────────────────────────────────
+
+def _kernel(fn):
+    """Compile with numba when it is installed; kernels only run on the numba backend."""
+    return njit(cache=True, error_model="numpy")(fn) if njit is not None else fn
+
+
+@_kernel
+def _ewm_step(weighted, old_wt, cur, old_wt_factor, new_wt, adjust):
+    """One step of pandas' ewm().mean() recursion (ignore_na=False)."""
+    if weighted == weighted:
+        old_wt *= old_wt_factor
+        if cur == cur:
+            if weighted != cur:
+                weighted = old_wt * weighted + new_wt * cur
+                total_wt = old_wt + new_wt
+                if total_wt != 1.0:     # EMA's steady state: skip the division
+                    weighted /= total_wt
+            old_wt = old_wt + new_wt if adjust else 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_wt
+
+
+@_kernel
+def _ewm_kernel(x, alpha, adjust, min_periods):
+    n = len(x)
+    out = np.empty(n)
+    new_wt = 1.0 if adjust else alpha
+    weighted, old_wt, nobs = np.nan, 1.0, 0
+    for i in range(n):
+        if x[i] == x[i]:
+            nobs += 1
+        weighted, old_wt = _ewm_step(weighted, old_wt, x[i], 1.0 - alpha, new_wt, adjust)
+        out[i] = weighted if nobs >= min_periods else np.nan
+    return out
+
+
+@_kernel
+def _ema_kernel(x, length):
+    n = len(x)
+    out = np.full(n, np.nan)
+    start = 0
+    while start < n and x[start] != x[start]:
+        start += 1
+    valid = 0
+    for i in range(start, n):
+        if x[i] == x[i]:
+            valid += 1
+    if valid < length:
+        return out
+    alpha = 2.0 / (length + 1)
+    seed = x[start:start + length].sum() / length
+    weighted, old_wt = _ewm_step(np.nan, 1.0, seed, 1.0 - alpha, alpha, False)
+    out[start + length - 1] = weighted
+    for i in range(start + length, n):
+        weighted, old_wt = _ewm_step(weighted, old_wt, x[i], 1.0 - alpha, alpha, False)
+        out[i] = weighted
+    return out
+
+
+@_kernel
+def _rsi_kernel(close, length):
+    """Wilder RSI in one pass: both rma recursions advance together."""
+    n = len(close)
+    out = np.full(n, np.nan)
+    decay = 1.0 - 1.0 / length
+    gain = loss = np.nan
+    gain_wt = loss_wt = 1.0
+    nobs = 0
+    for i in range(1, n):
+        diff = close[i] - close[i - 1]
+        if diff == diff:
+            nobs += 1
+            up, down = max(diff, 0.0), min(diff, 0.0)
+        else:
+            up = down = np.nan
+        gain, gain_wt = _ewm_step(gain, gain_wt, up, decay, 1.0, True)
+        loss, loss_wt = _ewm_step(loss, loss_wt, down, decay, 1.0, True)
+        if nobs >= length:
+            out[i] = 100.0 * gain / (gain + abs(loss))
+    return out
+
+
+@_kernel
+def _kahan_add(total, comp, v):
+    y = v - comp
+    t = total + y
+    return t, (t - total) - y
+
+
+@_kernel
+def _rolling_mean_kernel(x, length):
+    """Running window sum, Kahan-compensated like pandas; NaN while the window holds a NaN."""
+    n = len(x)
+    out = np.full(n, np.nan)
+    total = comp = 0.0
+    nans = 0
+    for i in range(n):
+        if x[i] == x[i]:
+            total, comp = _kahan_add(total, comp, x[i])
+        else:
+            nans += 1
+        if i >= length:
+            old = x[i - length]
+            if old == old:
+                total, comp = _kahan_add(total, comp, -old)
+            else:
+                nans -= 1
+        if i >= length - 1 and nans == 0:
+            out[i] = total / length
+    return out
+
+
+@_kernel
+def _rolling_std_kernel(x, length, ddof):
+    n = len(x)
+    out = np.full(n, np.nan)
+    for i in range(length - 1, n):
+        total = 0.0
+        for j in range(i - length + 1, i + 1):
+            total += x[j]
+        mean = total / length
+        sq = 0.0
+        for j in range(i - length + 1, i + 1):
+            sq += (x[j] - mean) ** 2
+        out[i] = math.sqrt(sq / (length - ddof))
+    return out
+
+
+@_kernel
+def _rolling_extreme_kernel(x, length, sign):
+    """
+    Rolling max (sign=1) or min (sign=-1). Tracks the extreme's position and
+    rescans the window only when it drops out, as talib does. A window
+    containing NaN yields NaN, like NumPy's max/min.
+    """
+    n = len(x)
+    out = np.full(n, np.nan)
+    best = last_nan = -1
+    value = 0.0                       # sign * x[best]
+    for i in range(n):
+        v = sign * x[i]
+        if v != v:
+            last_nan = i
+        elif best >= 0 and v >= value:
+            best, value = i, v
+        lo = i - length + 1
+        if best < lo:
+            best = -1
+            for j in range(max(lo, 0), i + 1):
+                w = sign * x[j]
+                if w == w and (best < 0 or w >= value):
+                    best, value = j, w
+        if lo >= 0 and last_nan < lo:
+            out[i] = sign * value
+    return out
+
+
+@_kernel
+def _range_position_kernel(high, low, close, length):
+    """
+    (close - lowest low) / (highest high - lowest low) over `length` bars: the
+    shared core of %K and Williams %R, with both extremes tracked in one pass.
+    """
+    n = len(close)
+    out = np.full(n, np.nan)
+    hi_at = lo_at = last_nan = -1
+    hi = lo = 0.0
+    for i in range(n):
+        h, l = high[i], low[i]
+        if h != h or l != l:
+            last_nan = i
+        else:
+            if hi_at >= 0 and h >= hi:
+                hi_at, hi = i, h
+            if lo_at >= 0 and l <= lo:
+                lo_at, lo = i, l
+        start = i - length + 1
+        if hi_at < start:
+            hi_at = -1
+            for j in range(max(start, 0), i + 1):
+                if high[j] == high[j] and (hi_at < 0 or high[j] >= hi):
+                    hi_at, hi = j, high[j]
+        if lo_at < start:
+            lo_at = -1
+            for j in range(max(start, 0), i + 1):
+                if low[j] == low[j] and (lo_at < 0 or low[j] <= lo):
+                    lo_at, lo = j, low[j]
+        if start >= 0 and last_nan < start:
+            out[i] = (close[i] - lo) / (hi - lo)
+    return out
+
+
+@_kernel
+def _ema_sweep_kernel(x, lengths):
+    n, m = len(x), len(lengths)
+    out = np.full((n, m), np.nan)
+    alpha = 2.0 / (lengths + 1)
+    z = np.zeros(m)
+    for t in range(n):
+        for j in range(m):
+            if t < lengths[j] - 1:
+                z[j] += x[t]                    # seed sum
+            elif t == lengths[j] - 1:
+                z[j] = (z[j] + x[t]) / lengths[j]
+                out[t, j] = z[j]
+            else:
+                z[j] = (1.0 - alpha[j]) * z[j] + alpha[j] * x[t]
+                out[t, j] = z[j]
+    return out
+
+
+@_kernel
+def _rsi_sweep_kernel(close, lengths):
+    n, m = len(close), len(lengths)
+    out = np.full((n, m), np.nan)
+    decay = 1.0 - 1.0 / lengths
+    gain = np.zeros(m)
+    loss = np.zeros(m)
+    for t in range(1, n):
+        diff = close[t] - close[t - 1]
+        up, down = max(diff, 0.0), min(diff, 0.0)
+        for j in range(m):
+            gain[j] = decay[j] * gain[j] + up
+            loss[j] = decay[j] * loss[j] + down
+            if t >= lengths[j]:
+                out[t, j] = 100.0 * gain[j] / (gain[j] + abs(loss[j]))
+    return out
+
+
+def use_backend(name: str):
+    """Select "numba" (compiled kernels) or "numpy" for the batch functions."""
+    global BACKEND
+    if name == "numba" and njit is None:
+        raise ImportError("numba is not installed")
+    if name not in ("numba", "numpy"):
+        raise ValueError(f"Unknown indicators backend: {name}")
+    BACKEND = name
+
+
+BACKEND = "numba" if njit is not None and os.environ.get("INDICATORS_BACKEND", "numba") == "numba" else "numpy"
+
+
+# ── Batch API ───────────────────────────────────────────────────────────────
+
+def _array(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def _padded(values: np.ndarray, n: int) -> np.ndarray:
+    """Left-pad a windowed result with NaN back to the input length."""
+    out = np.full(n, np.nan)
+    if len(values):
+        out[n - len(values):] = values
+    return out
+
+
+def _windows(x: np.ndarray, length: int) -> np.ndarray:
+    if len(x) < length:
+        return np.empty((0, length))
+    return np.lib.stride_tricks.sliding_window_view(x, length)
+
+
+def sma(x, length: int = 20) -> np.ndarray:
+    x = _array(x)
+    if BACKEND == "numba":
+        return _rolling_mean_kernel(x, length)
+    return _padded(_windows(x, length).mean(axis=1), len(x))
+
+
+def stdev(x, length: int = 20, ddof: int = 0) -> np.ndarray:
+    x = _array(x)
+    if BACKEND == "numba":
+        return _rolling_std_kernel(x, length, ddof)
+    return _padded(_windows(x, length).std(axis=1, ddof=ddof), len(x))
+
+
+def rolling_max(x, length: int) -> np.ndarray:
+    x = _array(x)
+    if BACKEND == "numba":
+        return _rolling_extreme_kernel(x, length, 1.0)
+    return _padded(_windows(x, length).max(axis=1), len(x))
+
+
+def rolling_min(x, length: int) -> np.ndarray:
+    x = _array(x)
+    if BACKEND == "numba":
+        return _rolling_extreme_kernel(x, length, -1.0)
+    return _padded(_windows(x, length).min(axis=1), len(x))
+
+
+def ema(x, length: int = 9) -> np.ndarray:
+    """EMA seeded with the SMA of the first `length` valid values."""
+    x = _array(x)
+    if BACKEND == "numba":
+        return _ema_kernel(x, length)
+    out = np.full(len(x), np.nan)
+    missing = np.isnan(x)
+    if len(x) - np.count_nonzero(missing) < length:
+        return out
+    start = int(np.argmin(missing))
+    seeded = x[start:].copy()
+    seeded[length - 1] = seeded[:length].mean()
+    seeded[:length - 1] = np.nan
+    out[start:] = pd.Series(seeded).ewm(span=length, adjust=False).mean().to_numpy()
+    return out
+
+
+def rma(x, length: int = 14) -> np.ndarray:
+    """Wilder smoothing as pandas_ta computes it: ewm(alpha=1/length, adjust=True)."""
+    x = _array(x)
+    if BACKEND == "numba":
+        return _ewm_kernel(x, 1.0 / length, True, length)
+    return pd.Series(x).ewm(alpha=1.0 / length, min_periods=length).mean().to_numpy()
+
+
+def rsi(close, length: int = 14) -> np.ndarray:
+    close = _array(close)
+    if BACKEND == "numba":
+        return _rsi_kernel(close, length)
+    diff = np.diff(close, prepend=np.nan)
+    gain = rma(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    loss = rma(np.where(diff < 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 * gain / (gain + np.abs(loss))
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9):
+    """(macd, signal, histogram)."""
+    close = _array(close)
+    line = ema(close, fast) - ema(close, slow)
+    sig = ema(line, signal)
+    return line, sig, line - sig
+
+
+def bbands(close, length: int = 20, std: float = 2.0, ddof: int = 0):
+    """(upper, middle, lower)."""
+    mid = sma(close, length)
+    width = std * stdev(close, length, ddof)
+    return mid + width, mid, mid - width
+
+
+def roc(close, length: int = 10) -> np.ndarray:
+    close = _array(close)
+    out = np.full(len(close), np.nan)
+    if len(close) > length:
+        out[length:] = 100.0 * (close[length:] / close[:-length] - 1.0)
+    return out
+
+
+def willr(high, low, close, length: int = 14) -> np.ndarray:
+    if BACKEND == "numba":
+        return 100.0 * (_range_position_kernel(_array(high), _array(low), _array(close), length) - 1.0)
+    hh, ll = rolling_max(high, length), rolling_min(low, length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -100.0 * (hh - _array(close)) / (hh - ll)
+
+
+def stoch(high, low, close, fastk: int = 14, slowk: int = 3, slowd: int = 3):
+    """(%K, %D) of the slow stochastic."""
+    if BACKEND == "numba":
+        fast = 100.0 * _range_position_kernel(_array(high), _array(low), _array(close), fastk)
+    else:
+        hh, ll = rolling_max(high, fastk), rolling_min(low, fastk)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fast = 100.0 * (_array(close) - ll) / (hh - ll)
+    k = sma(fast, slowk)
+    return k, sma(k, slowd)
+
+
+def chart_indicators(close) -> dict:
+    """The chart's indicator set (CHART_COLUMNS) for a close series."""
+    close = _array(close)
+    line, sig, hist = macd(close)
+    upper, mid, lower = bbands(close, 20, 2.0)
+    return {
+        "SMA": sma(close, 20), "EMA9": ema(close, 9), "RSI": rsi(close, 14),
+        "MACD": line, "MACD_S": sig, "MACD_H": hist,
+        "BB_U": upper, "BB_L": lower, "BB_M": mid,
+    }
+
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of an OHLCV frame with the CHART_COLUMNS added."""
+    df = df.copy()
+    for name, values in chart_indicators(df["close"]).items():
+        df[name] = values
+    return df
+
+
+# Names the quant agents have always imported
+def calculate_sma(df: pd.DataFrame, window: int = 20) -> pd.Series:
+    return pd.Series(sma(df["close"], window), index=df.index)
+
+
+def calculate_rsi(df: pd.DataFrame, window: int = 14) -> pd.Series:
+    return pd.Series(rsi(df["close"], window), index=df.index)
+
+
+# ── Sweep API ───────────────────────────────────────────────────────────────
+# Every column advances together: a single pass over time for all lengths,
+# instead of one batch call per length. Inputs must be gap-free (no NaN).
+
+def _lengths(lengths) -> np.ndarray:
+    lengths = np.asarray(lengths, dtype=np.int64).ravel()
+    if not len(lengths) or lengths.min() < 1:
+        raise ValueError("lengths must be positive integers")
+    return lengths
+
+
+def _finite(x) -> np.ndarray:
+    x = _array(x)
+    if not np.isfinite(x).all():
+        raise ValueError("sweeps need a gap-free series (no NaN/inf)")
+    return x
+
+
+def _linear_scan(u: np.ndarray, decay: np.ndarray) -> np.ndarray:
+    """
+    z[t] = decay * z[t-1] + u[t] for every column at once (z[-1] = 0).
+    The recursion runs blockwise: within sqrt(T)-row blocks for all blocks
+    together, then the block carries, so Python only loops ~2*sqrt(T) times.
+    """
+    n, m = u.shape
+    block = max(1, math.isqrt(n))
+    blocks = -(-n // block)
+    padded = np.zeros((blocks * block, m))
+    padded[:n] = u
+    padded = padded.reshape(blocks, block, m)
+    local = np.empty_like(padded)
+    acc = np.zeros((blocks, m))
+    for k in range(block):
+        acc = acc * decay + padded[:, k]
+        local[:, k] = acc
+    carry = np.zeros((blocks, m))               # z just before each block
+    decay_block = decay ** block
+    for b in range(1, blocks):
+        carry[b] = local[b - 1, -1] + decay_block * carry[b - 1]
+    powers = decay ** np.arange(1, block + 1)[:, None]
+    return (local + powers * carry[:, None, :]).reshape(-1, m)[:n]
+
+
+def sma_sweep(x, lengths) -> np.ndarray:
+    """SMA for each length (columns) from one cumulative sum."""
+    x, lengths = _finite(x), _lengths(lengths)
+    n = len(x)
+    anchor = x[0] if n else 0.0                 # keeps the running sum small
+    csum = np.concatenate([[0.0], np.cumsum(x - anchor)])
+    out = np.full((len(lengths), n), np.nan).T    # column-major: each length is contiguous
+    for j, length in enumerate(lengths):
+        if length <= n:
+            out[length - 1:, j] = anchor + (csum[length:] - csum[:-length]) / length
+    return out
+
+
+def ema_sweep(x, lengths) -> np.ndarray:
+    """EMA (seeded like ema()) for each length, as one stacked recursion."""
+    x, lengths = _finite(x), _lengths(lengths)
+    if BACKEND == "numba":
+        return _ema_sweep_kernel(x, lengths)
+    n = len(x)
+    alpha = 2.0 / (lengths + 1)
+    u = alpha * x[:, None]
+    seeds = sma_sweep(x, lengths)
+    rows = np.arange(n)[:, None]
+    starts = lengths[None, :] - 1
+    u = np.where(rows < starts, 0.0, u)
+    fits = lengths <= n
+    u[lengths[fits] - 1, np.flatnonzero(fits)] = seeds[lengths[fits] - 1, np.flatnonzero(fits)]
+    out = _linear_scan(u, 1.0 - alpha)
+    out[rows < starts] = np.nan
+    return out
+
+
+def rsi_sweep(close, lengths) -> np.ndarray:
+    """
+    RSI for each length. rma's normalizer is the same for gains and losses
+    and cancels, so each column is two stacked sums: 100*G/(G + |L|).
+    """
+    close, lengths = _finite(close), _lengths(lengths)
+    if BACKEND == "numba":
+        return _rsi_sweep_kernel(close, lengths)
+    n = len(close)
+    diff = np.diff(close, prepend=np.nan)[1:]
+    decay = 1.0 - 1.0 / lengths
+    gain = _linear_scan(np.repeat(np.maximum(diff, 0.0)[:, None], len(lengths), axis=1), decay)
+    loss = _linear_scan(np.repeat(np.minimum(diff, 0.0)[:, None], len(lengths), axis=1), decay)
+    out = np.full((n, len(lengths)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = 100.0 * gain / (gain + np.abs(loss))
+    out[np.arange(n)[:, None] < lengths[None, :]] = np.nan
+    return out
+
+
+SWEEPS = {"sma": sma_sweep, "ema": ema_sweep, "rsi": rsi_sweep}
+
+
+def sweep(name: str, close, lengths) -> np.ndarray:
+    """(time × length) values of indicator `name` (one of SWEEPS)."""
+    if name not in SWEEPS:
+        raise ValueError(f"No sweep for '{name}' (available: {', '.join(SWEEPS)})")
+    return SWEEPS[name](close, lengths)
+
+
+# ── Streaming API ───────────────────────────────────────────────────────────
+
+class RollingWindow:
+    """Mean and stdev of the last `length` values (sliding Welford update)."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.values = deque(maxlen=length)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.length
+
+    def update(self, x: float):
+        if len(self.values) < self.length:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values[0]
+            self.values.append(x)
+            mean = self.mean + (x - old) / self.length
+            self.m2 += (x - old) * (x - mean + old - self.mean)
+            self.mean = mean
+
+        # Bound rounding drift; O(length) once every _RESYNC_EVERY updates
+        self.updates += 1
+        if self.updates % _RESYNC_EVERY == 0:
+            n = len(self.values)
+            self.mean = math.fsum(self.values) / n
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+
+    def std(self, ddof: int = 0) -> float:
+        return math.sqrt(max(self.m2, 0.0) / (len(self.values) - ddof))
+
+    def to_dict(self) -> dict:
+        return {"length": self.length, "values": list(self.values), "mean": self.mean,
+                "m2": self.m2, "updates": self.updates}
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        w = cls(d["length"])
+        w.values.extend(d["values"])
+        w.mean, w.m2, w.updates = d["mean"], d["m2"], d["updates"]
+        return w
+
+
+class EMA:
+    """pandas_ta/talib EMA: SMA of the first `length` values, then alpha = 2/(length+1)."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.seed = []
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if self.seed is not None:
+            self.seed.append(x)
+            if len(self.seed) < self.length:
+                return NAN
+            self.value = math.fsum(self.seed) / self.length
+            self.seed = None
+            return self.value
+        self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {"length": self.length, "seed": self.seed, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        e = cls(d["length"])
+        e.seed, e.value = d["seed"], d["value"]
+        return e
+
+
+class RMA:
+    """pandas_ta rma: ewm(alpha=1/length, adjust=True, min_periods=length)."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.num = 0.0
+        self.den = 0.0
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        self.num *= self.decay
+        self.den *= self.decay
+        if not math.isnan(x):
+            self.num += x
+            self.den += 1.0
+            self.count += 1
+        return self.num / self.den if self.count >= self.length else NAN
+
+    def to_dict(self) -> dict:
+        return {"length": self.length, "num": self.num, "den": self.den, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        r = cls(d["length"])
+        r.num, r.den, r.count = d["num"], d["den"], d["count"]
+        return r
+
+
+class RSI:
+    def __init__(self, length: int = 14):
+        self.gain = RMA(length)
+        self.loss = RMA(length)
+        self.prev = None
 
+    def update(self, close: float) -> float:
+        diff = NAN if self.prev is None else close - self.prev
+        self.prev = close
+        gain = self.gain.update(max(diff, 0.0) if not math.isnan(diff) else NAN)
+        loss = self.loss.update(min(diff, 0.0) if not math.isnan(diff) else NAN)
+        total = gain + abs(loss)
+        return 100.0 * gain / total if total else NAN
 
-def calculate_sma(df, window=14):
-    return df["close"].rolling(window=window).mean()
+    def to_dict(self) -> dict:
+        return {"gain": self.gain.to_dict(), "loss": self.loss.to_dict(), "prev": self.prev}
 
+    @classmethod
+    def from_dict(cls, d: dict):
+        r = cls()
+        r.gain, r.loss, r.prev = RMA.from_dict(d["gain"]), RMA.from_dict(d["loss"]), d["prev"]
+        return r
 
-def calculate_rsi(df, window=14):
-    delta = df["close"].diff()
 
-    gain = np.where(delta > 0, delta, 0)
-    loss = np.where(delta < 0, -delta, 0)
+class MACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
 
-    avg_gain = pd.Series(gain).rolling(window=window).mean()
-    avg_loss = pd.Series(loss).rolling(window=window).mean()
+    def update(self, close: float):
+        macd = self.fast.update(close) - self.slow.update(close)
+        if math.isnan(macd):
+            return NAN, NAN, NAN
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
 
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k).to_dict() for k in ("fast", "slow", "signal")}
 
-    return rsi
+    @classmethod
+    def from_dict(cls, d: dict):
+        m = cls()
+        m.fast, m.slow, m.signal = (EMA.from_dict(d[k]) for k in ("fast", "slow", "signal"))
+        return m
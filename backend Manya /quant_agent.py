@@ -9,7 +9,7 @@ def quant_agent_decision(df):
             "predicted_price": None
         }
 
-    df["SMA"] = calculate_sma(df)
+    df["SMA"] = calculate_sma(df, window=14)
     df["RSI"] = calculate_rsi(df)
 
     df = df.dropna()
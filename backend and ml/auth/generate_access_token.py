@@ -1,3 +1,6 @@
+import json
+import os
+
 from fyers_apiv3 import fyersModel
 
 CLIENT_ID = "BX4VU41YBS-100"
@@ -17,3 +20,14 @@ session.set_token(AUTH_CODE)
 response = session.generate_token()
 
 print(response)
+
+# Hand the token pair to backend/fyers_auth.py, which reuses and refreshes it
+if response.get("s") == "ok":
+    cache = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", ".fyers_token.json")
+    with open(cache, "w", encoding="utf-8") as f:
+        json.dump({
+            "access_token": response["access_token"],
+            "refresh_token": response.get("refresh_token"),
+        }, f)
+    os.chmod(cache, 0o600)
+    print("Token saved to", os.path.normpath(cache))
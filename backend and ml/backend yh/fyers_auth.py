@@ -1,25 +1,45 @@
 import os
+import threading
+
 from dotenv import load_dotenv
 from fyers_apiv3 import fyersModel
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
+POOL_SIZE = 16
+
+_lock = threading.Lock()
+_client = None
+
+
 def get_fyers_client():
     """
     FYERS client ONLY for:
     - Authentication
     - Profile
     - Orders (future)
+
+    One FyersModel is shared by the process, so its requests.Session keeps
+    connections alive across calls; a changed access token is swapped in place.
     """
+    global _client
     client_id = os.getenv("FYERS_CLIENT_ID")
     access_token = os.getenv("FYERS_ACCESS_TOKEN")
 
     if not client_id or not access_token:
         raise ValueError("FYERS credentials missing")
 
-    fyers = fyersModel.FyersModel(
-        client_id=client_id,
-        token=access_token,
-        log_path=""
-    )
-    return fyers
+    with _lock:
+        if _client is None:
+            _client = fyersModel.FyersModel(
+                client_id=client_id,
+                token=access_token,
+                log_path=""
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _client.service.session.mount("https://", adapter)
+        elif _client.token != access_token:
+            _client.token = access_token
+            _client.header = f"{client_id}:{access_token}"
+        return _client
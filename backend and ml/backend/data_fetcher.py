@@ -1,6 +1,6 @@
 import pandas as pd
 from datetime import datetime, timedelta
-from fyers_auth import get_fyers_client
+from fyers_auth import AUTH_ERROR_CODES, get_fyers_client, invalidate_token
 
 
 def fetch_stock_data(symbol: str):
@@ -20,6 +20,12 @@ def fetch_stock_data(symbol: str):
 
     response = fyers.history(data)
 
+    # Token rejected mid-session: refresh once and retry on the pooled client
+    if response.get("code") in AUTH_ERROR_CODES:
+        invalidate_token(fyers.token)
+        fyers = get_fyers_client()
+        response = fyers.history(data)
+
     # ✅ SAFE CHECK
     if response.get("s") != "ok" or not response.get("candles"):
         print(f"FYERS history failed: {response}")
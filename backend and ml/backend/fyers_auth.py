@@ -1,20 +1,182 @@
-import os
-from dotenv import load_dotenv
-from fyers_apiv3 import fyersModel
-
-load_dotenv()
-
-def get_fyers_client():
-    client_id = os.getenv("FYERS_CLIENT_ID")
-    access_token = os.getenv("FYERS_ACCESS_TOKEN")
-
-    if not client_id or not access_token:
-        raise Exception("FYERS credentials missing in .env")
-
-    fyers = fyersModel.FyersModel(
-        client_id=client_id,
-        token=access_token,
-        log_path=""
-    )
-
-    return fyers
+"""
+FYERS client and access-token lifecycle.
+
+One FyersModel is shared by the whole process. Its service keeps a
+requests.Session, so reusing it keeps HTTP connections alive instead of
+paying client construction and TLS setup on every request.
+
+Access tokens are cached on disk (FYERS_TOKEN_CACHE, default
+.fyers_token.json next to this file) together with the refresh token written
+by auth/generate_access_token.py. A token is refreshed through the
+validate-refresh-token endpoint shortly before its JWT `exp`, under a lock so
+concurrent callers wait for one refresh and then share the new token. A
+failed refresh (network error, bad reply) keeps the current token in use
+until it actually expires and is not retried for REFRESH_BACKOFF_SECONDS.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+from fyers_apiv3 import fyersModel
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+TOKEN_CACHE = os.getenv(
+    "FYERS_TOKEN_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fyers_token.json"),
+)
+REFRESH_URL = "https://api-t1.fyers.in/api/v3/validate-refresh-token"
+REFRESH_MARGIN_SECONDS = 15 * 60
+REFRESH_BACKOFF_SECONDS = 60
+POOL_SIZE = 16
+
+# FYERS error codes meaning the access token is expired or invalid
+AUTH_ERROR_CODES = {-8, -15, -16, -17}
+
+_lock = threading.RLock()
+_client = None
+_token = None   # {"access_token", "refresh_token", "expires_at"}
+_retry_after = 0.0   # no refresh attempt before this (epoch s) after a failure
+
+
+def _jwt_expiry(access_token: str):
+    """`exp` claim of the JWT access token (epoch seconds), or None if unreadable."""
+    try:
+        payload = access_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+
+def _make_token(access_token: str, refresh_token: str = None) -> dict:
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "expires_at": _jwt_expiry(access_token),
+    }
+
+
+def _load_cached_token():
+    if not os.path.exists(TOKEN_CACHE):
+        return None
+    try:
+        with open(TOKEN_CACHE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        return _make_token(cached["access_token"], cached.get("refresh_token"))
+    except Exception as e:
+        print(f"[WARNING] Ignoring unreadable FYERS token cache: {e}")
+        return None
+
+
+def save_token(access_token: str, refresh_token: str = None):
+    """Persist a token pair to the cache file (owner-readable only)."""
+    tmp = TOKEN_CACHE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"access_token": access_token, "refresh_token": refresh_token}, f)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, TOKEN_CACHE)
+
+
+def _initial_token() -> dict:
+    """Whichever of the cached and .env tokens lives longer."""
+    candidates = [t for t in (
+        _load_cached_token(),
+        _make_token(os.getenv("FYERS_ACCESS_TOKEN"), os.getenv("FYERS_REFRESH_TOKEN"))
+        if os.getenv("FYERS_ACCESS_TOKEN") else None,
+    ) if t]
+    if not candidates:
+        raise Exception("FYERS credentials missing in .env")
+    return max(candidates, key=lambda t: t["expires_at"] or 0)
+
+
+def _needs_refresh(token: dict) -> bool:
+    expires_at = token["expires_at"]
+    return expires_at is not None and time.time() >= expires_at - REFRESH_MARGIN_SECONDS
+
+
+def _refresh(token: dict) -> dict:
+    """A refreshed token, or `token` itself if the refresh fails or is backing off."""
+    global _retry_after
+    if time.time() < _retry_after:
+        return token
+    client_id = os.getenv("FYERS_CLIENT_ID")
+    secret_key = os.getenv("FYERS_SECRET_KEY")
+    pin = os.getenv("FYERS_PIN")
+    if not (token.get("refresh_token") and client_id and secret_key and pin):
+        print("[WARNING] FYERS token expiring but no refresh token / secret / PIN configured")
+        return token
+
+    app_id_hash = hashlib.sha256(f"{client_id}:{secret_key}".encode()).hexdigest()
+    session = _client.service.session if _client is not None else requests
+    try:
+        response = session.post(REFRESH_URL, json={
+            "grant_type": "refresh_token",
+            "appIdHash": app_id_hash,
+            "refresh_token": token["refresh_token"],
+            "pin": pin,
+        }, timeout=10).json()
+    except Exception as e:
+        response = {"s": "error", "message": str(e)}
+
+    if response.get("s") != "ok" or not response.get("access_token"):
+        _retry_after = time.time() + REFRESH_BACKOFF_SECONDS
+        print(f"FYERS token refresh failed (retrying in {REFRESH_BACKOFF_SECONDS}s): {response}")
+        return token
+
+    refreshed = _make_token(response["access_token"], token["refresh_token"])
+    save_token(refreshed["access_token"], refreshed["refresh_token"])
+    print("[OK] FYERS access token refreshed")
+    return refreshed
+
+
+def get_access_token(force_refresh: bool = False) -> str:
+    global _token
+    with _lock:
+        if _token is None:
+            _token = _initial_token()
+        if force_refresh or _needs_refresh(_token):
+            _token = _refresh(_token)
+        return _token["access_token"]
+
+
+def invalidate_token(rejected_token: str):
+    """
+    Refresh right away after an API call was rejected with an auth error.
+    Only the first caller holding the rejected token refreshes; the others
+    find a newer token already in place.
+    """
+    global _token
+    with _lock:
+        if _token is not None and _token["access_token"] == rejected_token:
+            _token = _refresh(_token)
+
+
+def get_fyers_client():
+    global _client
+    client_id = os.getenv("FYERS_CLIENT_ID")
+    if not client_id:
+        raise Exception("FYERS credentials missing in .env")
+
+    with _lock:
+        access_token = get_access_token()
+        if _client is None:
+            _client = fyersModel.FyersModel(
+                client_id=client_id,
+                token=access_token,
+                log_path=""
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _client.service.session.mount("https://", adapter)
+        elif _client.token != access_token:
+            # Swap the token in place so the pooled session survives a refresh
+            _client.token = access_token
+            _client.header = f"{client_id}:{access_token}"
+        return _client
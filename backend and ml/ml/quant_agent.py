@@ -1,21 +1,16 @@
-from .indicators import calculate_sma, calculate_rsi
+from .indicators import calculate_sma, calculate_rsi, macd
 import pandas as pd
 import numpy as np
-import talib  # optional, keep if installed
 
 
 def quant_agent_decision(df):
     df = df.copy()
 
     # Indicators
-    df['sma'] = calculate_sma(df)
+    df['sma'] = calculate_sma(df, window=5)
     df['rsi'] = calculate_rsi(df)
 
-    try:
-        macd, signal, _ = talib.MACD(df['close'])
-        df['macd'] = macd
-    except Exception:
-        df['macd'] = 0  # fallback if TA-Lib fails
+    df['macd'] = macd(df['close'])[0]
 
     last_close = df['close'].iloc[-1]
     last_sma = df['sma'].iloc[-1]
@@ -1,10 +1,26 @@
+import threading
+
 from fyers_apiv3 import fyersModel
+from requests.adapters import HTTPAdapter
+
 from config import CLIENT_ID, ACCESS_TOKEN
 
+POOL_SIZE = 16
+
+_lock = threading.Lock()
+_client = None
+
+
 def get_fyers_client():
-    fyers = fyersModel.FyersModel(
-        client_id=CLIENT_ID,
-        token=ACCESS_TOKEN,
-        log_path=""
-    )
-    return fyers
+    """One FyersModel per process: its requests.Session keeps connections alive."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = fyersModel.FyersModel(
+                client_id=CLIENT_ID,
+                token=ACCESS_TOKEN,
+                log_path=""
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _client.service.session.mount("https://", adapter)
+        return _client
@@ -1,7 +1,7 @@
 from indicators import calculate_sma, calculate_rsi
 
 def quant_agent_decision(df):
-    df["SMA"] = calculate_sma(df)
+    df["SMA"] = calculate_sma(df, window=5)
     df["RSI"] = calculate_rsi(df)
 
     last_close = df["close"].iloc[-1]